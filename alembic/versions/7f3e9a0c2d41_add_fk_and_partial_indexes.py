@@ -0,0 +1,55 @@
+"""add fk, partial and composite indexes
+
+Revision ID: 7f3e9a0c2d41
+Revises: 5d2a7c41e9b3
+Create Date: 2026-10-18 10:02:17.530941
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7f3e9a0c2d41'
+down_revision: Union[str, Sequence[str], None] = '5d2a7c41e9b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+LIVE = sa.text("statut <> 'delete'")
+
+# (nom, table, colonnes, prédicat partiel)
+INDEXES = [
+    # Clés étrangères ; (user_id, created_at) sert aussi d'index sur transaction.user_id
+    ('ix_transaction_package_id', 'transaction', ['package_id'], None),
+    ('ix_voucher_user_id', 'voucher', ['user_id'], None),
+    ('ix_voucher_package_id', 'voucher', ['package_id'], None),
+    # Composites pour les listes filtrées et triées par date
+    ('ix_transaction_user_id_created_at', 'transaction', ['user_id', 'created_at'], None),
+    ('ix_transaction_payment_status_created_at', 'transaction', ['payment_status', 'created_at'], None),
+    # Partiels sur les lignes non supprimées (filtre statut != "delete" des listes)
+    ('ix_user_live_created_at', 'user', ['created_at', 'id'], LIVE),
+    ('ix_voucher_live_generated_at', 'voucher', ['generated_at', 'id'], LIVE),
+    ('ix_package_live_name', 'package', ['name'], LIVE),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE INDEX CONCURRENTLY ne peut pas tourner dans une transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            op.create_index(
+                name, table, columns,
+                postgresql_concurrently=True,
+                postgresql_where=where,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
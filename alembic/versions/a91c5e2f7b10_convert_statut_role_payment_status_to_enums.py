@@ -0,0 +1,127 @@
+"""convert statut, role and payment_status to enums
+
+Revision ID: a91c5e2f7b10
+Revises: 7f3e9a0c2d41
+Create Date: 2026-10-18 11:24:05.664310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a91c5e2f7b10'
+down_revision: Union[str, Sequence[str], None] = '7f3e9a0c2d41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 10000
+
+STATUT = postgresql.ENUM('active', 'deleted', 'used', 'expired', 'refunded', 'chargeback', name='statut')
+ROLE = postgresql.ENUM('user', 'admin', name='user_role')
+PAYMENT_STATUS = postgresql.ENUM('PENDING', 'ACCEPTED', 'REFUSED', name='payment_status')
+
+# (table, colonne, type, expression de normalisation des valeurs existantes)
+COLUMNS = [
+    ('user', 'statut', STATUT, "CASE WHEN statut IN ('delete', 'deleted') THEN 'deleted' ELSE 'active' END"),
+    ('package', 'statut', STATUT, "CASE WHEN statut IN ('delete', 'deleted') THEN 'deleted' ELSE 'active' END"),
+    ('transaction', 'statut', STATUT,
+     "CASE WHEN statut IN ('delete', 'deleted') THEN 'deleted' "
+     "WHEN statut IN ('refunded', 'chargeback') THEN statut ELSE 'active' END"),
+    ('voucher', 'statut', STATUT,
+     "CASE WHEN statut IN ('delete', 'deleted') THEN 'deleted' "
+     "WHEN statut IN ('used', 'expired') THEN statut ELSE 'active' END"),
+    ('user', 'role', ROLE, "CASE WHEN role = 'admin' THEN 'admin' ELSE 'user' END"),
+    ('transaction', 'payment_status', PAYMENT_STATUS,
+     "CASE WHEN upper(payment_status) IN ('ACCEPTED', 'SUCCESS') THEN 'ACCEPTED' "
+     "WHEN upper(payment_status) = 'REFUSED' THEN 'REFUSED' ELSE 'PENDING' END"),
+]
+
+# Defaults varchar posés par e4c0f749fcd2 : non convertibles par USING, retirés avant le
+# changement de type (les modèles n'ont pas de server_default) et remis au downgrade
+VARCHAR_DEFAULTS = {('user', 'statut'): 'active', ('user', 'role'): 'user'}
+
+# Index partiels dont le prédicat porte sur statut : reconstruits avec la nouvelle valeur
+PARTIAL_INDEXES = [
+    ('ix_user_live_created_at', 'user', ['created_at', 'id']),
+    ('ix_voucher_live_generated_at', 'voucher', ['generated_at', 'id']),
+    ('ix_package_live_name', 'package', ['name']),
+]
+
+
+def _normalize_in_batches(table: str, column: str, expression: str) -> None:
+    # Lots courts, chacun commité : pas de verrou long ni de transaction géante
+    if op.get_context().as_sql:
+        # Mode --sql : pas de rowcount, une seule mise à jour
+        op.execute(f'UPDATE "{table}" SET {column} = {expression}')
+        return
+    bind = op.get_bind()
+    while True:
+        result = bind.execute(sa.text(
+            f'UPDATE "{table}" SET {column} = {expression} '
+            f'WHERE ctid IN (SELECT ctid FROM "{table}" '
+            f'WHERE {column} IS DISTINCT FROM ({expression}) LIMIT {BATCH_SIZE})'
+        ))
+        if result.rowcount == 0:
+            break
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _ in PARTIAL_INDEXES:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+        for table, column, _, expression in COLUMNS:
+            _normalize_in_batches(table, column, expression)
+
+    bind = op.get_bind()
+    for enum_type in (STATUT, ROLE, PAYMENT_STATUS):
+        enum_type.create(bind, checkfirst=True)
+    for table, column, enum_type, _ in COLUMNS:
+        op.alter_column(table, column, server_default=None)
+        op.alter_column(
+            table, column,
+            type_=enum_type,
+            nullable=False,
+            postgresql_using=f'{column}::{enum_type.name}',
+        )
+
+    with op.get_context().autocommit_block():
+        for name, table, columns in PARTIAL_INDEXES:
+            op.create_index(
+                name, table, columns,
+                postgresql_concurrently=True,
+                postgresql_where=sa.text("statut <> 'deleted'"),
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _ in PARTIAL_INDEXES:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+
+    for table, column, _, _ in COLUMNS:
+        op.alter_column(table, column, server_default=None)
+        op.alter_column(
+            table, column,
+            type_=sa.VARCHAR(),
+            postgresql_using=f'{column}::text',
+        )
+    for (table, column), default in VARCHAR_DEFAULTS.items():
+        op.alter_column(table, column, server_default=default)
+    bind = op.get_bind()
+    for enum_type in (PAYMENT_STATUS, ROLE, STATUT):
+        enum_type.drop(bind, checkfirst=True)
+    op.execute("UPDATE \"user\" SET statut = 'delete' WHERE statut = 'deleted'")
+
+    with op.get_context().autocommit_block():
+        for name, table, columns in PARTIAL_INDEXES:
+            op.create_index(
+                name, table, columns,
+                postgresql_concurrently=True,
+                postgresql_where=sa.text("statut <> 'delete'"),
+            )
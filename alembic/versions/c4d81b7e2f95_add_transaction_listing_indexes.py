@@ -0,0 +1,48 @@
+"""add transaction listing indexes
+
+Revision ID: c4d81b7e2f95
+Revises: a91c5e2f7b10
+Create Date: 2026-10-18 15:41:08.214377
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4d81b7e2f95'
+down_revision: Union[str, Sequence[str], None] = 'a91c5e2f7b10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (nom, table, colonnes) : un index par filtre de GET /transaction/transactions/,
+# suivi de la clé de tri pour servir la première page sans tri
+INDEXES = [
+    ('ix_transaction_created_at_id', 'transaction', ['created_at', 'id']),
+    ('ix_transaction_payment_method_created_at', 'transaction', ['payment_method', 'created_at']),
+    ('ix_transaction_package_id_created_at', 'transaction', ['package_id', 'created_at']),
+]
+
+# Préfixe de ix_transaction_package_id_created_at : redondant une fois celui-ci construit
+REPLACED_INDEXES = [
+    ('ix_transaction_package_id', 'transaction', ['package_id']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+        for name, table, _ in REPLACED_INDEXES:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, columns in REPLACED_INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,52 @@
+"""add payment notification inbox
+
+Revision ID: d8b3f6a1c027
+Revises: c4d81b7e2f95
+Create Date: 2026-10-18 18:12:44.903516
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8b3f6a1c027'
+down_revision: Union[str, Sequence[str], None] = 'c4d81b7e2f95'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INBOX_STATUS = postgresql.ENUM('PENDING', 'PROCESSING', 'DONE', 'FAILED', name='inbox_status')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    INBOX_STATUS.create(op.get_bind(), checkfirst=True)
+    op.create_table(
+        'payment_notification',
+        sa.Column('id', sa.Uuid(), nullable=False),
+        sa.Column('cpm_trans_id', sa.String(), nullable=False),
+        sa.Column('cpm_site_id', sa.String(), nullable=True),
+        sa.Column('status', postgresql.ENUM(name='inbox_status', create_type=False), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('received_count', sa.Integer(), nullable=False),
+        sa.Column('received_at', sa.DateTime(), nullable=False),
+        sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+        sa.Column('processed_at', sa.DateTime(), nullable=True),
+        sa.Column('outcome', sa.String(), nullable=True),
+        sa.Column('last_error', sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('cpm_trans_id'),
+    )
+    # Seules les lignes à traiter sont indexées : la file reste petite quand les DONE s'accumulent
+    op.create_index('ix_payment_notification_due', 'payment_notification', ['next_attempt_at'],
+                    postgresql_where=sa.text("status IN ('PENDING', 'PROCESSING')"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_payment_notification_due', table_name='payment_notification')
+    op.drop_table('payment_notification')
+    INBOX_STATUS.drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,38 @@
+"""add voucher.transaction_id (one voucher per transaction)
+
+Revision ID: e2a6c9d4b813
+Revises: d8b3f6a1c027
+Create Date: 2026-10-18 19:03:27.118402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2a6c9d4b813'
+down_revision: Union[str, Sequence[str], None] = 'd8b3f6a1c027'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Colonne NULL sans défaut : ajout instantané, les vouchers existants restent sans transaction
+    op.add_column('voucher', sa.Column('transaction_id', sa.Uuid(), nullable=True))
+    op.create_foreign_key('voucher_transaction_id_fkey', 'voucher', 'transaction', ['transaction_id'], ['id'],
+                          ondelete='SET NULL')
+    # L'index unique porte la garantie "un voucher par transaction" ; NULL reste autorisé plusieurs fois
+    with op.get_context().autocommit_block():
+        op.create_index('ix_voucher_transaction_id', 'voucher', ['transaction_id'], unique=True,
+                        postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_voucher_transaction_id', table_name='voucher', postgresql_concurrently=True, if_exists=True)
+    op.drop_constraint('voucher_transaction_id_fkey', 'voucher', type_='foreignkey')
+    op.drop_column('voucher', 'transaction_id')
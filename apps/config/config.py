@@ -1,18 +1,70 @@
+from typing import Literal
 from pydantic import BaseModel, EmailStr
 from pydantic_settings import BaseSettings
 
 
 class AppConfig(BaseSettings):
+    # --- Environnement ---
+    app_env: Literal["development", "test", "production"] = "production"
+
     # --- Database ---
     db_name: str
     db_user: str
     db_password: str
     database_url: str
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    sql_echo: bool = False
+    sql_slow_query_ms: float = 200.0
+    sql_sample_rate: float = 0.0
+    sql_histogram_max_shapes: int = 200
+    n_plus_one_threshold: int = 10
+    n_plus_one_action: Literal["warn", "raise"] = "warn"
+    export_batch_size: int = 1000
+    package_catalog_ttl_seconds: int = 300
+    counts_exact_threshold: int = 100_000
+    counts_cache_ttl_seconds: int = 60
+    cache_bus_enabled: bool = True
+    cache_bus_heartbeat_seconds: float = 30.0
+    # Cache-Control par route (ETag toujours envoyé) ; JSON dans CACHE_CONTROL
+    cache_control: dict[str, str] = {
+        "packages": "private, max-age=60",
+        "package": "private, max-age=60",
+        "users_me": "private, no-cache",
+    }
 
     # --- CinetPay ---
     apikey: str
     side_id: str
     cle_secrete: str
+    cinetpay_base_url: str = "https://api-checkout.cinetpay.com"
+    cinetpay_timeout_seconds: float = 10.0
+    cinetpay_connect_timeout_seconds: float = 3.0
+    cinetpay_max_retries: int = 2
+    cinetpay_backoff_seconds: float = 0.5
+    cinetpay_max_connections: int = 20
+    cinetpay_verification_ttl_seconds: int = 60
+    cinetpay_verification_cache_size: int = 10000
+    # Boîte de réception des webhooks (voir services/payement_service/notification_inbox.py)
+    payment_inbox_enabled: bool = True
+    payment_inbox_workers: int = 4
+    payment_inbox_batch_size: int = 5
+    payment_inbox_poll_seconds: float = 5.0
+    payment_inbox_lease_seconds: float = 300.0
+    payment_inbox_max_attempts: int = 8
+    payment_inbox_backoff_seconds: float = 10.0
+    payment_inbox_backoff_max_seconds: float = 900.0
+    # Réconciliation des PENDING sans webhook (voir services/payement_service/reconciliation.py)
+    reconciliation_enabled: bool = True
+    reconciliation_interval_seconds: float = 300.0
+    reconciliation_stale_after_seconds: int = 900
+    reconciliation_max_age_hours: int = 72
+    reconciliation_batch_size: int = 200
+    reconciliation_concurrency: int = 8
+    reconciliation_max_per_run: int = 5000
 
     # --- SMTP ---
     smtp_server: str
@@ -27,6 +79,11 @@ class AppConfig(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int
     oauth2_scheme: str
     SCOPES: dict[str, str]
+    password_hash_workers: int = 4
+    auth_stateless_claims: bool = False
+    token_version_cache_ttl_seconds: int = 30
+    token_version_cache_size: int = 10000
+    token_cache_size: int = 10000
 
     #--mikrotik---
     mikrotik_host: str
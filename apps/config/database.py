@@ -1,7 +1,13 @@
 from sqlmodel import create_engine, SQLModel,Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 import os
 from dotenv import load_dotenv
 from apps.models.models import User, Package, Voucher, Transaction
+from apps.config.db_pool import InstrumentedQueuePool, InstrumentedAsyncAdaptedQueuePool
+from config import config
+from services.observability_service.sql_tracing import SQLTracer
 
 
 load_dotenv()  
@@ -9,12 +15,43 @@ load_dotenv()
 DATABASE_URL= os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise ValueError("DATABASE_URL is not set in the environment variables.")
-engine = create_engine(DATABASE_URL, echo=True)
+
+# Réglages du pool, par worker uvicorn (à dimensionner derrière PgBouncer)
+POOL_OPTIONS = {
+    "pool_size": config.db_pool_size,
+    "max_overflow": config.db_max_overflow,
+    "pool_timeout": config.db_pool_timeout,
+    "pool_recycle": config.db_pool_recycle,
+    "pool_pre_ping": config.db_pool_pre_ping,
+}
+engine = create_engine(DATABASE_URL, echo=config.sql_echo, poolclass=InstrumentedQueuePool, **POOL_OPTIONS)
+
+# Moteur asynchrone (asyncpg) pour les routes async : même base, autre driver
+ASYNC_DATABASE_URL = make_url(DATABASE_URL).set(drivername="postgresql+asyncpg")
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL, echo=config.sql_echo, poolclass=InstrumentedAsyncAdaptedQueuePool, **POOL_OPTIONS
+)
+
+# Remplace echo=True : seules les requêtes lentes sont journalisées, le reste est échantillonné
+sql_tracer = SQLTracer(
+    slow_query_ms=config.sql_slow_query_ms,
+    sample_rate=config.sql_sample_rate,
+    max_shapes=config.sql_histogram_max_shapes,
+)
+sql_tracer.install(engine)
+sql_tracer.install(async_engine.sync_engine)
+# expire_on_commit=False : pas de rechargement implicite (donc pas d'I/O cachée) après commit
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
 
 def get_session():
     with Session(engine) as session:
         yield session
 
 
+async def get_async_session():
+    async with AsyncSessionLocal() as session:
+        yield session
+
+
 def create_table_in_db():
-    SQLModel.metadata.create_all(engine)
\ No newline at end of file
+    SQLModel.metadata.create_all(engine)
@@ -1,20 +1,20 @@
 
-import jwt # type: ignore
 from fastapi import Depends, HTTPException, Security, status
 from fastapi.security import (
     OAuth2PasswordBearer,
     SecurityScopes,
 )
-from jwt import InvalidTokenError # pyright: ignore[reportMissingImports]
-from schema.auth import User,TokenData
+from schema.auth import User,CurrentUser
 from passlib.context import CryptContext # pyright: ignore[reportMissingModuleSource]
-from pydantic import ValidationError
 from typing import Annotated
-from database import get_session
-from sqlmodel import Session
+from database import get_async_session
+from sqlmodel.ext.asyncio.session import AsyncSession
 from apps.models.models import User 
-from crud.user import get_user_by_username
+from apps.models.enums import Role, Statut
+from crud.user import get_user_by_username, get_token_version
 from config import config
+from services.auth_service.auth import token_versions
+from services.auth_service.token_codec import InvalidTokenError, decode_token_data
 
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -24,10 +24,10 @@ oauth2_scheme = OAuth2PasswordBearer(
     scopes={"user": "obtain user information",
              "admin": "all access",},
 )
-def get_current_user(
+async def get_current_user(
     security_scopes: SecurityScopes,
     token: Annotated[str, Depends(oauth2_scheme)],
-    db: Session = Depends(get_session)
+    db: AsyncSession = Depends(get_async_session)
 ):
     if security_scopes.scopes:
         authenticate_value = f'Bearer scope="{security_scopes.scope_str}"'
@@ -39,19 +39,28 @@ def get_current_user(
         headers={"WWW-Authenticate": authenticate_value},
     )
     try:
-        payload = jwt.decode(token, config.SECRET_KEY, algorithms=[config.ALGORITHM])
-        username = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-        token_scopes = payload.get("scopes", [])
-        token_data = TokenData(scopes=token_scopes, username=username)
-    except (InvalidTokenError, ValidationError):
+        token_data = decode_token_data(token)
+    except InvalidTokenError:
         raise credentials_exception
     if token_data.username is None:
         raise credentials_exception
-    user = get_user_by_username(db, username=token_data.username)
-    if user is None:
-        raise credentials_exception
+    if config.auth_stateless_claims and token_data.user_id is not None and token_data.token_version is not None:
+        # Mode sans état : on fait confiance aux claims, seule la version est vérifiée (en cache)
+        current_version = await token_versions.get(token_data.user_id, lambda user_id: get_token_version(db, user_id))
+        if current_version != token_data.token_version:
+            raise credentials_exception
+        user = CurrentUser(
+            id=token_data.user_id,
+            username=token_data.username,
+            role=token_data.role or Role.USER,
+            statut=token_data.statut or Statut.ACTIVE,
+        )
+    else:
+        user = await get_user_by_username(db, username=token_data.username)
+        if user is None:
+            raise credentials_exception
+        if token_data.token_version is not None and user.token_version != token_data.token_version:
+            raise credentials_exception
     for scope in security_scopes.scopes:
         if scope not in token_data.scopes:
             raise HTTPException(
@@ -65,14 +74,14 @@ def get_current_user(
 def get_current_active_user(
     current_user: Annotated[User, Security(get_current_user, scopes=["user"])],
 ):
-    if current_user.statut=="delete":
+    if current_user.statut == Statut.DELETED:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
 def get_current_active_admin(
     current_user: Annotated[User, Security(get_current_user, scopes=["admin"])],
 ):
-    if current_user.role != "admin" :
+    if current_user.role != Role.ADMIN :
          raise HTTPException(status_code=400, detail="Not enough permissions")
     else:
         return current_user
\ No newline at end of file
@@ -0,0 +1,66 @@
+# crud/counts.py
+from collections import Counter
+from datetime import datetime, timezone
+from sqlalchemy import func, text
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from config import config
+from apps.models.enums import Statut
+from apps.models.models import live
+from services.cache_service.counters import TRACKED, CountEntry, count_cache
+
+# Estimation du planificateur : reltuples vaut -1 tant que la table n'a jamais été analysée
+PLANNER_ESTIMATE = text("""
+    SELECT c.reltuples::bigint AS estimate,
+           greatest(s.last_analyze, s.last_autoanalyze) AS analyzed_at
+    FROM pg_class c
+    LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid
+    WHERE c.oid = to_regclass(:table)
+""")
+
+# Valeurs les plus fréquentes de la colonne (statistiques d'ANALYZE)
+STATUS_FREQUENCIES = text("""
+    SELECT unnest(most_common_vals::text::text[]) AS value, unnest(most_common_freqs) AS freq
+    FROM pg_stats
+    WHERE schemaname = current_schema() AND tablename = :table AND attname = :column
+""")
+
+
+async def exact_counts(session: AsyncSession, model, column: str) -> CountEntry:
+    status = getattr(model, column)
+    stmt = select(status, func.count()).group_by(status)
+    if column != "statut":
+        stmt = stmt.where(live(model))
+    rows = (await session.exec(stmt)).all()
+    by_status = Counter({str(value): count for value, count in rows})
+    total = sum(by_status.values()) - by_status[Statut.DELETED.value]
+    return CountEntry(total=total, by_status=by_status, source="exact", as_of=datetime.now(timezone.utc))
+
+
+async def estimated_counts(session: AsyncSession, model, column: str, estimate: int, analyzed_at) -> CountEntry:
+    table = model.__tablename__
+    statut_rows = (await session.exec(STATUS_FREQUENCIES, params={"table": table, "column": "statut"})).all()
+    deleted = round(estimate * dict(statut_rows).get(Statut.DELETED.value, 0))
+    if column == "statut":
+        by_status = Counter({value: round(freq * estimate) for value, freq in statut_rows})
+    else:
+        # Fréquences calculées sur toute la table, ramenées aux lignes non supprimées
+        rows = (await session.exec(STATUS_FREQUENCIES, params={"table": table, "column": column})).all()
+        by_status = Counter({value: round(freq * (estimate - deleted)) for value, freq in rows})
+    return CountEntry(total=estimate - deleted, by_status=by_status, source="estimate", as_of=analyzed_at)
+
+
+async def get_counts(session: AsyncSession, name: str) -> CountEntry:
+    cached = count_cache.get(name)
+    if cached is not None:
+        return cached
+    model, column = TRACKED[name]
+    row = (await session.exec(PLANNER_ESTIMATE, params={"table": f'"{model.__tablename__}"'})).first()
+    estimate, analyzed_at = (row.estimate, row.analyzed_at) if row else (-1, None)
+    # COUNT(*) exact tant qu'il est bon marché (ou faute de statistiques)
+    if estimate < 0 or estimate <= config.counts_exact_threshold:
+        entry = await exact_counts(session, model, column)
+    else:
+        entry = await estimated_counts(session, model, column, estimate, analyzed_at)
+    count_cache.set(name, entry)
+    return entry
@@ -0,0 +1,124 @@
+# crud/notification.py
+from collections import namedtuple
+from datetime import timedelta
+from typing import Optional
+from uuid import UUID
+from sqlalchemy import case, func, literal, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from apps.models.models import PaymentNotification
+from apps.models.enums import InboxStatus, INBOX_STATUS_TYPE
+from apps.models.ids import uuid7
+
+ClaimedNotification = namedtuple("ClaimedNotification", "id cpm_trans_id attempts received_count")
+
+
+def due():
+    # Même prédicat que l'index partiel ix_payment_notification_due, rendu en littéraux
+    # pour que le planificateur l'utilise aussi avec des requêtes préparées
+    return PaymentNotification.status.in_(
+        [literal(status.value, literal_execute=True) for status in (InboxStatus.PENDING, InboxStatus.PROCESSING)]
+    )
+
+
+def _status(value: InboxStatus):
+    return literal(value, type_=INBOX_STATUS_TYPE)
+
+
+async def record_notification(session: AsyncSession, cpm_trans_id: str, cpm_site_id: Optional[str]) -> None:
+    # Une seule ligne par transaction : les doublons (retries CinetPay) sont absorbés.
+    # Une notification déjà traitée ou abandonnée repart avec un nouveau crédit de tentatives ;
+    # une notification en cours garde son bail (voir finish_notification).
+    requeue = PaymentNotification.status.in_([InboxStatus.DONE, InboxStatus.FAILED])
+    stmt = insert(PaymentNotification).values(
+        id=uuid7(), cpm_trans_id=cpm_trans_id, cpm_site_id=cpm_site_id, status=InboxStatus.PENDING,
+        attempts=0, received_count=1, received_at=func.now(), next_attempt_at=func.now(),
+    ).on_conflict_do_update(
+        index_elements=[PaymentNotification.cpm_trans_id],
+        set_={
+            "received_count": PaymentNotification.received_count + 1,
+            "status": case((requeue, _status(InboxStatus.PENDING)), else_=PaymentNotification.status),
+            "attempts": case((requeue, 0), else_=PaymentNotification.attempts),
+            "next_attempt_at": case((requeue, func.now()), else_=PaymentNotification.next_attempt_at),
+        },
+    )
+    await session.exec(stmt)
+    await session.commit()
+
+
+async def claim_notifications(session: AsyncSession, limit: int, lease_seconds: float) -> list[ClaimedNotification]:
+    # SKIP LOCKED : les workers concurrents se partagent la file sans s'attendre.
+    # Un bail expiré (worker arrêté en cours de traitement) rend la ligne à nouveau éligible.
+    candidates = (
+        select(PaymentNotification.id)
+        .where(due(), PaymentNotification.next_attempt_at <= func.now())
+        .order_by(PaymentNotification.next_attempt_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    stmt = (
+        update(PaymentNotification)
+        .where(PaymentNotification.id.in_(candidates.scalar_subquery()))
+        .values(
+            status=InboxStatus.PROCESSING,
+            attempts=PaymentNotification.attempts + 1,
+            next_attempt_at=func.now() + timedelta(seconds=lease_seconds),
+        )
+        .returning(PaymentNotification.id, PaymentNotification.cpm_trans_id, PaymentNotification.attempts,
+                   PaymentNotification.received_count)
+        .execution_options(synchronize_session=False)
+    )
+    rows = (await session.exec(stmt)).all()
+    await session.commit()
+    return [ClaimedNotification(*row) for row in rows]
+
+
+async def finish_notification(session: AsyncSession, notification: ClaimedNotification, outcome: str) -> None:
+    # Un doublon reçu pendant le traitement a pu suivre un changement d'état côté
+    # CinetPay : la notification est alors remise en file au lieu d'être close
+    redelivered = PaymentNotification.received_count != notification.received_count
+    stmt = (
+        update(PaymentNotification)
+        .where(PaymentNotification.id == notification.id)
+        .values(
+            status=case((redelivered, _status(InboxStatus.PENDING)), else_=_status(InboxStatus.DONE)),
+            next_attempt_at=func.now(),
+            processed_at=func.now(),
+            outcome=outcome,
+            last_error=None,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    await session.exec(stmt)
+    await session.commit()
+
+
+async def retry_notification(session: AsyncSession, notification_id: UUID, error: str, delay_seconds: float,
+                             give_up: bool) -> None:
+    stmt = (
+        update(PaymentNotification)
+        .where(PaymentNotification.id == notification_id)
+        .values(
+            status=InboxStatus.FAILED if give_up else InboxStatus.PENDING,
+            next_attempt_at=func.now() + timedelta(seconds=delay_seconds),
+            last_error=error,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    await session.exec(stmt)
+    await session.commit()
+
+
+async def inbox_backlog(session: AsyncSession) -> dict:
+    # Les lignes DONE ne sont pas comptées : elles s'accumulent sans limite
+    stmt = (
+        select(PaymentNotification.status, func.count(), func.min(PaymentNotification.received_at))
+        .where(PaymentNotification.status != InboxStatus.DONE)
+        .group_by(PaymentNotification.status)
+    )
+    rows = (await session.exec(stmt)).all()
+    return {
+        str(status): {"count": count, "oldest_received_at": oldest.isoformat() if oldest else None}
+        for status, count, oldest in rows
+    }
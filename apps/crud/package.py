@@ -1,27 +1,64 @@
-from sqlmodel import Session, select
-from apps.models.models import Package
+from bisect import bisect_right
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from fastapi.concurrency import run_in_threadpool
+from apps.models.models import Package, live
+from apps.models.enums import Statut
 from services.service_mikrotik.mikrotik import MikroTikProfileCreator
+from services.cache_service.package_catalog import CatalogSnapshot, package_catalog
+from services.cache_service.invalidation import invalidation_bus
+from crud.pagination import decode_cursor, page_from_rows
+from schema.package import PackageReadSimple
 from fastapi import HTTPException
-from database import get_session
 from uuid import UUID
 
 
-def get_unsynced_packages(session: Session, package_id :UUID ):
-    return session.exec(select(Package).where(Package.is_synced == False and Package.id ==package_id and Package.statut !="delete")).all()
+async def get_unsynced_packages(session: AsyncSession, package_id :UUID ):
+    stmt = select(Package).where(Package.is_synced == False, Package.id == package_id, live(Package))
+    return (await session.exec(stmt)).all()
 
 
-def sync_package(session: Session, package: Package, creator: MikroTikProfileCreator):
-    profile_name = creator.create_profile_from_package(package)
-    if profile_name and package.statut != "delete":
+async def sync_package(session: AsyncSession, package: Package, creator: MikroTikProfileCreator):
+    # L'API RouterOS est bloquante : on l'exécute hors de la boucle d'événements
+    profile_name = await run_in_threadpool(creator.create_profile_from_package, package)
+    if profile_name and package.statut != Statut.DELETED:
         package.is_synced = True
         package.mikrotik_profile_name = profile_name
         session.add(package)
-        session.commit()
+        await invalidation_bus.publish(session, "package", package.id)
+        await session.commit()
         return True
     return False
 
-def get_package_by_id(session:Session, pakage_id:UUID):
-    package = session.get(Package, pakage_id)
-    if not package or package.statut == "delete":
+async def get_package_by_id(session:AsyncSession, pakage_id:UUID):
+    package = (await get_package_catalog(session)).by_id.get(pakage_id)
+    if not package:
         raise HTTPException(status_code=404, detail="Package not found")
     return package
+
+
+async def load_live_packages(session: AsyncSession) -> list[PackageReadSimple]:
+    # Copies détachées de la session : l'instantané est partagé entre requêtes
+    packages = (await session.exec(select(Package).where(live(Package)))).all()
+    return [PackageReadSimple.model_validate(package) for package in packages]
+
+
+async def get_package_catalog(session: AsyncSession) -> CatalogSnapshot:
+    return await package_catalog.get(lambda: load_live_packages(session))
+
+
+async def get_package_for_delivery(session: AsyncSession, package_id: UUID):
+    # Package d'une transaction ; s'il a été supprimé depuis l'achat, on relit la base
+    package = (await get_package_catalog(session)).by_id.get(package_id)
+    if package is None:
+        package = await session.get(Package, package_id)
+    return package
+
+
+def catalog_page(snapshot: CatalogSnapshot, cursor: str | None, limit: int) -> dict:
+    # Même curseur que la pagination SQL par nom (voir crud.pagination)
+    start = 0
+    if cursor:
+        (name,) = decode_cursor(cursor, (Package.name,))
+        start = bisect_right(snapshot.packages, name, key=lambda package: package.name)
+    return page_from_rows(snapshot.packages[start:start + limit + 1], (Package.name,), limit)
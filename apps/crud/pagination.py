@@ -0,0 +1,90 @@
+# crud/pagination.py
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Optional, Sequence
+from uuid import UUID
+from fastapi import HTTPException
+from sqlalchemy import DateTime, Uuid, tuple_
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from services.export_service.fast_json import rows_to_dicts
+
+
+def encode_cursor(values: Sequence) -> str:
+    # Curseur opaque : valeurs de la clé de tri du dernier élément renvoyé
+    raw = json.dumps([value.isoformat() if isinstance(value, datetime) else str(value) for value in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, columns: Sequence) -> tuple:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError(cursor)
+        return tuple(_parse(column, value) for column, value in zip(columns, values))
+    except (ValueError, TypeError, binascii.Error, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _parse(column, value: str):
+    if isinstance(column.type, DateTime):
+        return datetime.fromisoformat(value)
+    if isinstance(column.type, Uuid):
+        return UUID(value)
+    return str(value)
+
+
+def keyset_query(stmt, columns: Sequence, cursor: Optional[str], limit: int, descending: bool = False):
+    """Page suivant `cursor` dans l'ordre de `columns` (colonnes d'un index, la dernière unique).
+
+    Une ligne de plus que `limit` est demandée pour savoir s'il existe une page suivante.
+    """
+    if cursor:
+        key, after = tuple_(*columns), tuple_(*decode_cursor(cursor, columns))
+        stmt = stmt.where(key < after if descending else key > after)
+    order = [column.desc() for column in columns] if descending else list(columns)
+    return stmt.order_by(*order).limit(limit + 1)
+
+
+def page_from_rows(rows: Sequence, columns: Sequence, limit: int) -> dict:
+    items = list(rows[:limit])
+    next_cursor = None
+    if len(rows) > limit:
+        next_cursor = encode_cursor([getattr(items[-1], column.key) for column in columns])
+    return {"items": items, "next_cursor": next_cursor}
+
+
+async def paginate(session: AsyncSession, stmt, columns: Sequence, cursor: Optional[str], limit: int,
+                   descending: bool = False) -> dict:
+    rows = (await session.exec(keyset_query(stmt, columns, cursor, limit, descending))).all()
+    return page_from_rows(rows, columns, limit)
+
+
+def parse_fields(fields: Optional[str], schema) -> list[str]:
+    # ?fields=a,b : sous-ensemble des champs du schéma de lecture, dans l'ordre demandé
+    allowed = list(schema.model_fields)
+    if not fields:
+        return allowed
+    requested = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in requested if name not in allowed]
+    if unknown or not requested:
+        raise HTTPException(
+            status_code=422,
+            detail={"msg": "Unknown fields", "unknown": unknown, "allowed": allowed},
+        )
+    return requested
+
+
+async def paginate_columns(session: AsyncSession, model, fields: Sequence[str], where: Sequence, columns: Sequence,
+                           cursor: Optional[str], limit: int, descending: bool = False) -> dict:
+    """Comme paginate(), mais ne lit que `fields` (+ la clé de tri) et renvoie des dicts."""
+    selected = list(dict.fromkeys([*fields, *(column.key for column in columns)]))
+    stmt = select(*(getattr(model, name) for name in selected)).where(*where)
+    rows = (await session.exec(keyset_query(stmt, columns, cursor, limit, descending))).all()
+    page = page_from_rows(rows, columns, limit)
+    # `fields` en tête de `selected` : zip() s'arrête avant les colonnes de tri ajoutées
+    page["items"] = rows_to_dicts(fields, page["items"])
+    return page
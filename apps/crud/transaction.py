@@ -1,13 +1,18 @@
 # crud/transaction.py
-from typing import Optional
-from sqlmodel import Session, select
-from models import Transaction, User
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Optional, Sequence
+from sqlalchemy import String, Uuid, column, func, tuple_, update, values
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from models import Transaction, User, live
+from apps.models.enums import Statut, PaymentStatus, PAYMENT_STATUS_TYPE
 from uuid import UUID
 from fastapi import HTTPException
+from schema.transaction import TransactionFilter
 
-def create_transaction(session: Session, *, transaction_id: str, user_id: UUID,
+async def create_transaction(session: AsyncSession, *, transaction_id: str, user_id: UUID,
                        amount: float, package_id: UUID,
-                       payment_method: str , status: str = "PENDING") -> Transaction:
+                       payment_method: str , status: PaymentStatus = PaymentStatus.PENDING) -> Transaction:
     tx = Transaction(
         payment_gateway_ref=transaction_id,
         user_id=user_id,
@@ -17,41 +22,159 @@ def create_transaction(session: Session, *, transaction_id: str, user_id: UUID,
         payment_status=status,
     )
     session.add(tx)
-    session.commit()
-    session.refresh(tx)
+    await session.commit()
+    await session.refresh(tx)
     return tx
 
-def get_transaction_by_txid(session: Session, transaction_id: str) -> Optional[Transaction]:
-    stmt = select(Transaction).where(Transaction.payment_gateway_ref== transaction_id and Transaction.statut !="delete")
+async def get_transaction_by_txid(session: AsyncSession, transaction_id: str) -> Optional[Transaction]:
+    stmt = select(Transaction).where(Transaction.payment_gateway_ref== transaction_id, live(Transaction))
     if not transaction_id or transaction_id.strip() == "" :
         raise HTTPException(status_code=400, detail="Transaction ID is required")
     if not session:
         raise HTTPException(status_code=500, detail="Database session is not available")
-    return session.exec(stmt).first()
+    return (await session.exec(stmt)).first()
 
 
-def update_transaction_status(session: Session, transaction_id: str, new_status: str, method:str | None ) -> Optional[Transaction]:
-    tx = get_transaction_by_txid(session, transaction_id)
-    if not tx or tx.statut == "delete":
+async def lock_transaction_by_txid(session: AsyncSession, transaction_id: str, skip_locked: bool = False) -> Optional[Transaction]:
+    # Verrou de ligne jusqu'à la fin de la transaction SQL ; avec skip_locked, None si un autre
+    # traitement le détient déjà (aucune attente)
+    stmt = (
+        select(Transaction)
+        .where(Transaction.payment_gateway_ref == transaction_id, live(Transaction))
+        .with_for_update(skip_locked=skip_locked)
+        .execution_options(populate_existing=True)
+    )
+    return (await session.exec(stmt)).first()
+
+
+async def update_transaction_status(session: AsyncSession, transaction_id: str, new_status: PaymentStatus, method:str | None ) -> Optional[Transaction]:
+    tx = await get_transaction_by_txid(session, transaction_id)
+    if not tx or tx.statut == Statut.DELETED:
         return None
     tx.payment_status = new_status
     tx.payment_method = method 
     session.add(tx)
-    session.commit()
-    session.refresh(tx)
+    await session.commit()
+    await session.refresh(tx)
     return tx
 
 
-def get_user_email_by_user_id(session: Session, user_id: UUID) -> Optional[str]:
-    stmt = select(User).where(User.id == user_id and User.statut !="delete" )
-    user_email= session.exec(stmt).first()
-    if user_email:
-        return user_email.email
-    return None
+async def settle_pending_transaction(session: AsyncSession, transaction_id: str, new_status: PaymentStatus,
+                                    method: Optional[str]) -> bool:
+    # Ne change que les transactions encore PENDING : une notification tardive ne peut pas
+    # défaire une acceptation (voucher déjà émis) ; False si la transaction était déjà réglée
+    stmt = (
+        update(Transaction)
+        .where(Transaction.payment_gateway_ref == transaction_id, Transaction.payment_status == PaymentStatus.PENDING,
+               live(Transaction))
+        .values(payment_status=new_status, payment_method=func.coalesce(method, Transaction.payment_method))
+        .execution_options(synchronize_session=False)
+    )
+    result = await session.exec(stmt)
+    await session.commit()
+    return result.rowcount > 0
+
+
+async def get_user_email_by_user_id(session: AsyncSession, user_id: UUID) -> Optional[str]:
+    stmt = select(User.email).where(User.id == user_id, live(User) )
+    return (await session.exec(stmt)).first()
     
-def get_email_by_transaction_id(session: Session, transaction_id: str) -> Optional[str]:
-    tx = get_transaction_by_txid(session, transaction_id)
-    if not tx or tx.statut == "delete":
+async def get_email_by_transaction_id(session: AsyncSession, transaction_id: str) -> Optional[str]:
+    tx = await get_transaction_by_txid(session, transaction_id)
+    if not tx or tx.statut == Statut.DELETED:
         return None
-    user_email = get_user_email_by_user_id(session, tx.user_id)
-    return user_email
\ No newline at end of file
+    user_email = await get_user_email_by_user_id(session, tx.user_id)
+    return user_email
+
+
+# Colonnes exportées : lignes brutes (pas d'objets ORM) pour une mémoire constante
+EXPORT_COLUMNS = (
+    Transaction.id,
+    Transaction.created_at,
+    Transaction.user_id,
+    Transaction.package_id,
+    Transaction.amount_paid,
+    Transaction.payment_method,
+    Transaction.payment_status,
+    Transaction.payment_gateway_ref,
+    Transaction.statut,
+)
+
+
+def transaction_export_query(created_from: Optional[datetime] = None, created_to: Optional[datetime] = None,
+                             statuses: Optional[Sequence[PaymentStatus]] = None):
+    stmt = select(*EXPORT_COLUMNS).where(live(Transaction))
+    if created_from:
+        stmt = stmt.where(Transaction.created_at >= created_from)
+    if created_to:
+        stmt = stmt.where(Transaction.created_at < created_to)
+    if statuses:
+        stmt = stmt.where(Transaction.payment_status.in_(statuses))
+    return stmt.order_by(Transaction.created_at, Transaction.id)
+
+
+async def stream_transactions(session: AsyncSession, stmt, batch_size: int) -> AsyncIterator[Sequence]:
+    # Curseur côté serveur : au plus batch_size lignes en mémoire à la fois
+    result = await session.stream(stmt.execution_options(yield_per=batch_size))
+    async for rows in result.partitions():
+        yield rows
+
+
+def transaction_list_filters(filters: TransactionFilter) -> list:
+    clauses = [live(Transaction)]
+    for name in ("payment_status", "payment_method", "package_id", "user_id"):
+        value = getattr(filters, name)
+        if value is not None:
+            clauses.append(getattr(Transaction, name) == value)
+    if filters.created_from:
+        clauses.append(Transaction.created_at >= filters.created_from)
+    if filters.created_to:
+        clauses.append(Transaction.created_at < filters.created_to)
+    return clauses
+
+
+def _stale_pending(stale_after: timedelta, max_age: timedelta) -> list:
+    # Transactions PENDING vieilles d'au moins stale_after (le webhook aurait dû arriver),
+    # dans la limite de max_age ; servi par ix_transaction_payment_status_created_at
+    return [
+        Transaction.payment_status == PaymentStatus.PENDING,
+        Transaction.payment_gateway_ref.is_not(None),
+        Transaction.created_at < func.now() - stale_after,
+        Transaction.created_at >= func.now() - max_age,
+        live(Transaction),
+    ]
+
+
+async def stale_pending_transactions(session: AsyncSession, stale_after: timedelta, max_age: timedelta,
+                                     after: Optional[tuple], limit: int) -> list:
+    # Lot suivant (created_at, id) > after, dans l'ordre de l'index
+    stmt = select(Transaction.id, Transaction.payment_gateway_ref, Transaction.created_at).where(
+        *_stale_pending(stale_after, max_age)
+    )
+    if after:
+        stmt = stmt.where(tuple_(Transaction.created_at, Transaction.id) > tuple_(*after))
+    stmt = stmt.order_by(Transaction.created_at, Transaction.id).limit(limit)
+    return (await session.exec(stmt)).all()
+
+
+async def count_stale_pending(session: AsyncSession, stale_after: timedelta, max_age: timedelta) -> int:
+    stmt = select(func.count()).select_from(Transaction).where(*_stale_pending(stale_after, max_age))
+    return (await session.exec(stmt)).one()
+
+
+async def bulk_update_transaction_status(session: AsyncSession, changes: Sequence[tuple[UUID, PaymentStatus, Optional[str]]]) -> int:
+    """Applique (id, statut, méthode) en un seul UPDATE ... FROM (VALUES ...) ; seules les lignes encore PENDING changent."""
+    if not changes:
+        return 0
+    rows = values(
+        column("id", Uuid), column("status", PAYMENT_STATUS_TYPE), column("method", String), name="changes"
+    ).data(list(changes))
+    stmt = (
+        update(Transaction)
+        .where(Transaction.id == rows.c.id, Transaction.payment_status == PaymentStatus.PENDING)
+        .values(payment_status=rows.c.status, payment_method=func.coalesce(rows.c.method, Transaction.payment_method))
+        .execution_options(synchronize_session=False)
+    )
+    result = await session.exec(stmt)
+    await session.commit()
+    return result.rowcount
@@ -2,29 +2,42 @@
 from typing import Optional, List
 from uuid import UUID
 from fastapi import HTTPException
-from sqlmodel import Session, select
-from apps.models.models import User
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from apps.models.models import User, live
+from apps.models.enums import Statut
 from schema.user import UserCreate, UserReadSimple, UserReadDetail, UserUpdate
 
 
-def get_user_by_id(session: Session, user_id: UUID) -> Optional[User]:
-    user = session.get(User, user_id)
-    if not user or user.statut == "delete" :
+async def get_user_by_id(session: AsyncSession, user_id: UUID) -> Optional[User]:
+    user = await session.get(User, user_id)
+    if not user or user.statut == Statut.DELETED :
         raise HTTPException(status_code=404, detail="User not found")
     return user
 
-def get_user_by_username(session: Session, username: str) -> Optional[User]:
+async def get_user_by_username(session: AsyncSession, username: str) -> Optional[User]:
     stmt = select(User).where(User.username == username)
-    user = session.exec(stmt).first()
-    if not user or user.statut == "delete":
+    user = (await session.exec(stmt)).first()
+    if not user or user.statut == Statut.DELETED:
         raise HTTPException(status_code=404, detail="User not found")
-    print("User found:", user)    
     return user
 
 
-def get_role_by_username(session: Session, username: str) -> Optional[str]:
+async def ensure_user_exists(session: AsyncSession, user_id: UUID) -> None:
+    # Contrôle d'existence sans charger la ligne complète
+    stmt = select(User.id).where(User.id == user_id, live(User))
+    if (await session.exec(stmt)).first() is None:
+        raise HTTPException(status_code=404, detail="User not found")
+
+
+async def get_token_version(session: AsyncSession, user_id: UUID) -> Optional[int]:
+    stmt = select(User.token_version).where(User.id == user_id, live(User))
+    return (await session.exec(stmt)).first()
+
+
+async def get_role_by_username(session: AsyncSession, username: str) -> Optional[str]:
     stmt = select(User).where(User.username == username)
-    user = session.exec(stmt).first()
-    if user and user.statut != "delete":
+    user = (await session.exec(stmt)).first()
+    if user and user.statut != Statut.DELETED:
         return user.role
-    return None
\ No newline at end of file
+    return None
@@ -1,13 +1,21 @@
-from sqlmodel import Session
+from typing import Optional
+from uuid import UUID
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from apps.models.models import Voucher
 from schema.voucher import VoucherCreate    
 
-def create_voucher(
-    session: Session,
+async def create_voucher(
+    session: AsyncSession,
     voucher_data: VoucherCreate
 ) -> Voucher:
     db_voucher = Voucher.model_validate(voucher_data)
     session.add(db_voucher) 
-    session.commit()
-    session.refresh(db_voucher)
+    await session.commit()
+    await session.refresh(db_voucher)
     return db_voucher
+
+
+async def get_voucher_code_for_transaction(session: AsyncSession, transaction_id: UUID) -> Optional[str]:
+    stmt = select(Voucher.username_voucher).where(Voucher.transaction_id == transaction_id)
+    return (await session.exec(stmt)).first()
@@ -0,0 +1,50 @@
+# models/enums.py
+from enum import StrEnum
+from typing import Optional
+from sqlalchemy import Enum as SAEnum
+
+
+class Statut(StrEnum):
+    ACTIVE = "active"
+    DELETED = "deleted"
+    USED = "used"
+    EXPIRED = "expired"
+    REFUNDED = "refunded"
+    CHARGEBACK = "chargeback"
+
+
+class Role(StrEnum):
+    USER = "user"
+    ADMIN = "admin"
+
+
+class PaymentStatus(StrEnum):
+    PENDING = "PENDING"
+    ACCEPTED = "ACCEPTED"
+    REFUSED = "REFUSED"
+
+    @classmethod
+    def from_gateway(cls, value: Optional[str]) -> "PaymentStatus":
+        # CinetPay renvoie aussi des états intermédiaires (WAITING_FOR_CUSTOMER, ...)
+        try:
+            return cls(value)
+        except ValueError:
+            return cls.PENDING
+
+
+class InboxStatus(StrEnum):
+    PENDING = "PENDING"        # à traiter dès next_attempt_at
+    PROCESSING = "PROCESSING"  # réservée par un worker jusqu'à next_attempt_at (bail)
+    DONE = "DONE"
+    FAILED = "FAILED"          # tentatives épuisées
+
+
+def _pg_enum(enum_cls, name: str) -> SAEnum:
+    # Type ENUM PostgreSQL stockant les valeurs (et non les noms) des membres
+    return SAEnum(enum_cls, name=name, values_callable=lambda members: [m.value for m in members])
+
+
+STATUT_TYPE = _pg_enum(Statut, "statut")
+ROLE_TYPE = _pg_enum(Role, "user_role")
+PAYMENT_STATUS_TYPE = _pg_enum(PaymentStatus, "payment_status")
+INBOX_STATUS_TYPE = _pg_enum(InboxStatus, "inbox_status")
@@ -0,0 +1,35 @@
+# models/ids.py
+import os
+import threading
+import time
+from uuid import UUID
+
+_lock = threading.Lock()
+_last_ms = 0
+_seq = 0
+
+
+def uuid7() -> UUID:
+    """UUID version 7 (RFC 9562) : horodatage Unix en ms sur 48 bits puis aléatoire.
+
+    Les identifiants générés par un même processus sont strictement croissants :
+    dans une même milliseconde, rand_a sert de compteur (12 bits).
+    """
+    global _last_ms, _seq
+    with _lock:
+        now_ms = time.time_ns() // 1_000_000
+        if now_ms > _last_ms:
+            _last_ms = now_ms
+            # Départ aléatoire dans la moitié basse : laisse de la place au compteur
+            _seq = int.from_bytes(os.urandom(2)) & 0x7FF
+        else:
+            _seq += 1
+            if _seq > 0xFFF:
+                # Compteur épuisé (ou horloge reculée) : on avance l'horodatage
+                _last_ms += 1
+                _seq = 0
+        timestamp_ms, seq = _last_ms, _seq
+
+    rand_b = int.from_bytes(os.urandom(8)) & 0x3FFF_FFFF_FFFF_FFFF
+    value = (timestamp_ms & 0xFFFF_FFFF_FFFF) << 80 | 0x7 << 76 | seq << 64 | 0b10 << 62 | rand_b
+    return UUID(int=value)
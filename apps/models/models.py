@@ -2,25 +2,58 @@
 from typing import Optional
 from datetime import datetime, timezone 
 from sqlmodel import SQLModel, Field, Relationship
-from uuid import UUID, uuid4
+from sqlalchemy import Index, literal, text
+from apps.models.enums import (Statut, Role, PaymentStatus, InboxStatus, STATUT_TYPE, ROLE_TYPE, PAYMENT_STATUS_TYPE,
+                               INBOX_STATUS_TYPE)
+from uuid import UUID
+from apps.models.ids import uuid7
 from pydantic import EmailStr
 
 
+# Prédicat des index partiels : doit rester identique au filtre des requêtes (voir live())
+LIVE_ROWS = text("statut <> 'deleted'")
+
+
+def utcnow() -> datetime:
+    # Colonnes "timestamp without time zone" : UTC naïf (asyncpg refuse un datetime aware)
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # Filtres reçus avec un décalage (ex. "...+01:00") : ramenés en UTC naïf avant comparaison
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def live(model):
+    # Filtre "non supprimé" ; la valeur est rendue en littéral pour que le planificateur
+    # puisse utiliser les index partiels même avec des requêtes préparées (asyncpg)
+    return model.statut != literal(Statut.DELETED.value, literal_execute=True)
+
+
 class User(SQLModel, table=True):
-    id: Optional[UUID] = Field(default_factory=uuid4, primary_key=True)
+    __table_args__ = (
+        Index("ix_user_live_created_at", "created_at", "id", postgresql_where=LIVE_ROWS),
+    )
+    id: Optional[UUID] = Field(default_factory=uuid7, primary_key=True)
     username: str = Field(index=True, unique=True)
     hashed_password: str = Field()
     email: Optional[EmailStr] = Field(default=None, index=True, unique=True)
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), nullable=False)
+    created_at: datetime = Field(default_factory=utcnow, nullable=False)
     numero: Optional[str] = Field(default=None, index=True, unique=True)    
     vouchers: list["Voucher"] = Relationship(back_populates="user", passive_deletes="all", cascade_delete=False)
     transactions: list["Transaction"] = Relationship(back_populates="user", passive_deletes="all", cascade_delete=False)
-    statut: str = Field(default="active", nullable=False)
-    role :  str = Field(default="user")
+    statut: Statut = Field(default=Statut.ACTIVE, sa_type=STATUT_TYPE, nullable=False)
+    role :  Role = Field(default=Role.USER, sa_type=ROLE_TYPE, nullable=False)
+    token_version: int = Field(default=0, nullable=False)  # incrémenté à chaque révocation des jetons
 
 
 class Package(SQLModel, table=True):
-    id: Optional[UUID] = Field(default_factory=uuid4, primary_key=True)
+    __table_args__ = (
+        Index("ix_package_live_name", "name", postgresql_where=LIVE_ROWS),
+    )
+    id: Optional[UUID] = Field(default_factory=uuid7, primary_key=True)
     name: str = Field(index=True, unique=True)
     price: float = Field()
     validity_hours: int = Field()
@@ -32,31 +65,67 @@ class Package(SQLModel, table=True):
     #quantity_mbps: Optional[int] = Field(default=None)
     vouchers: list["Voucher"] = Relationship(back_populates="package", passive_deletes="all", cascade_delete=False)
     transactions: list["Transaction"] = Relationship(back_populates="package", passive_deletes="all", cascade_delete=False)
-    statut: str = Field(default="active", nullable=False)  # active, deleted
+    statut: Statut = Field(default=Statut.ACTIVE, sa_type=STATUT_TYPE, nullable=False)  # active, deleted
 
 
 
 class Transaction(SQLModel, table=True):
-    id: Optional[UUID] = Field(default_factory=uuid4, primary_key=True)
+    __table_args__ = (
+        Index("ix_transaction_user_id_created_at", "user_id", "created_at"),
+        Index("ix_transaction_payment_status_created_at", "payment_status", "created_at"),
+        Index("ix_transaction_payment_method_created_at", "payment_method", "created_at"),
+        Index("ix_transaction_package_id_created_at", "package_id", "created_at"),
+        Index("ix_transaction_created_at_id", "created_at", "id"),
+    )
+    id: Optional[UUID] = Field(default_factory=uuid7, primary_key=True)
     user_id:UUID = Field(foreign_key="user.id", ondelete="SET NULL", nullable=True)
     package_id: UUID = Field(foreign_key="package.id", ondelete="SET NULL", nullable=True)
     amount_paid: float = Field()
     payment_method: str | None = Field(default="cash")
-    payment_status: str = Field(default="pending")
+    payment_status: PaymentStatus = Field(default=PaymentStatus.PENDING, sa_type=PAYMENT_STATUS_TYPE, nullable=False)
     payment_gateway_ref: Optional[str] = Field(default=None, unique=True)
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), nullable=False)
+    created_at: datetime = Field(default_factory=utcnow, nullable=False)
     user: Optional["User"] = Relationship(back_populates="transactions")
     package: Optional["Package"] = Relationship(back_populates="transactions")
-    statut: str = Field(default="active", nullable=False)  # active, refunded, chargeback, deleted
+    statut: Statut = Field(default=Statut.ACTIVE, sa_type=STATUT_TYPE, nullable=False)  # active, refunded, chargeback, deleted
     
 
 class Voucher(SQLModel, table=True):
-    id: Optional[UUID] = Field(default_factory=uuid4, primary_key=True)
+    __table_args__ = (
+        Index("ix_voucher_live_generated_at", "generated_at", "id", postgresql_where=LIVE_ROWS),
+        # Au plus un voucher par transaction payée (les vouchers manuels ont transaction_id NULL)
+        Index("ix_voucher_transaction_id", "transaction_id", unique=True),
+    )
+    id: Optional[UUID] = Field(default_factory=uuid7, primary_key=True)
     username_voucher: str = Field(index=True, unique=True)
     password_voucher: str
-    user_id: UUID | None = Field(foreign_key="user.id", ondelete="SET NULL",nullable=True)
-    package_id: UUID | None = Field(foreign_key="package.id", ondelete="SET NULL",nullable=True)
-    generated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), nullable=False)
+    user_id: UUID | None = Field(foreign_key="user.id", ondelete="SET NULL",nullable=True, index=True)
+    package_id: UUID | None = Field(foreign_key="package.id", ondelete="SET NULL",nullable=True, index=True)
+    transaction_id: UUID | None = Field(default=None, foreign_key="transaction.id", ondelete="SET NULL", nullable=True)
+    generated_at: datetime = Field(default_factory=utcnow, nullable=False)
     user: Optional["User"] = Relationship(back_populates="vouchers")
     package: Optional["Package"] = Relationship(back_populates="vouchers")
-    statut: str = Field(default="active", nullable=False)  # active, used, expired, deleted
+    statut: Statut = Field(default=Statut.ACTIVE, sa_type=STATUT_TYPE, nullable=False)  # active, used, expired, deleted
+
+
+# Prédicat de l'index des notifications à traiter (voir crud/notification.claim_notifications)
+DUE_NOTIFICATIONS = text("status IN ('PENDING', 'PROCESSING')")
+
+
+class PaymentNotification(SQLModel, table=True):
+    # Boîte de réception des webhooks CinetPay : une ligne par transaction notifiée
+    __tablename__ = "payment_notification"
+    __table_args__ = (
+        Index("ix_payment_notification_due", "next_attempt_at", postgresql_where=DUE_NOTIFICATIONS),
+    )
+    id: Optional[UUID] = Field(default_factory=uuid7, primary_key=True)
+    cpm_trans_id: str = Field(unique=True, nullable=False)
+    cpm_site_id: Optional[str] = Field(default=None)
+    status: InboxStatus = Field(default=InboxStatus.PENDING, sa_type=INBOX_STATUS_TYPE, nullable=False)
+    attempts: int = Field(default=0, nullable=False)
+    received_count: int = Field(default=1, nullable=False)
+    received_at: datetime = Field(default_factory=utcnow, nullable=False)
+    next_attempt_at: datetime = Field(default_factory=utcnow, nullable=False)
+    processed_at: Optional[datetime] = Field(default=None)
+    outcome: Optional[str] = Field(default=None)
+    last_error: Optional[str] = Field(default=None)
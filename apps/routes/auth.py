@@ -1,9 +1,9 @@
-from fastapi import Depends, FastAPI, HTTPException, Security, status
+from fastapi import Depends, FastAPI, HTTPException, Request, Response, Security, status
 from fastapi.security import (
     OAuth2PasswordRequestForm,
 )
 from schema.auth import User,Token
-from database import get_session
+from database import get_async_session
 from typing import Annotated
 from datetime import timedelta
 
@@ -19,29 +19,41 @@ from crud.auth import get_current_user
 from config import config
 from crud.user import get_user_by_id
 from uuid import UUID
-from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 from typing import List 
 from schema.user import UserReadSimple
+from apps.models.enums import Role, Statut
 from services.auth_service.auth import authenticate_user, create_access_token
 from datetime import timedelta
 from schema.auth import Token
 from fastapi.security import OAuth2PasswordRequestForm  
-from crud.user import get_role_by_username, get_user_by_username
-from services.auth_service.auth import create_refresh_token
-from jose import jwt, JWTError 
+from crud.user import get_user_by_username
+from services.auth_service.auth import create_refresh_token, build_access_token_data, revoke_user_tokens
+from services.auth_service.token_codec import InvalidTokenError, decode_token_data
+from services.cache_service.http_cache import conditional, make_etag
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 @router.get("/users/me/", response_model=UserReadSimple) 
 async def read_users_me(
+    request: Request,
+    response: Response,
     current_user: Annotated[User, Depends(get_current_active_user)],
+    session: AsyncSession = Depends(get_async_session),
 ):
-    return current_user
+    # En mode sans état current_user ne porte que les claims : on lit le profil complet
+    user = await get_user_by_id(session, current_user.id)
+    # ETag calculé sur les colonnes exposées, avant toute sérialisation
+    etag = make_etag(*(getattr(user, field) for field in UserReadSimple.model_fields))
+    not_modified = conditional(request, response, "users_me", etag, vary="Authorization")
+    if not_modified:
+        return not_modified
+    return user
 
 
 @router.get("/status/")
 async def read_system_status(current_user: Annotated[User, Depends(get_current_user)]):
-    if current_user.statut != "active":
+    if current_user.statut != Statut.ACTIVE:
         raise HTTPException(status_code=400, detail="Inactive user")
     return {"status": "active", "user": current_user.username}
 
@@ -51,24 +63,23 @@ async def read_system_status(current_user: Annotated[User, Depends(get_current_u
 @router.post("/token", response_model=Token)
 async def login_for_access_token(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
 ) -> Token:
-    user = authenticate_user(form_data.username, form_data.password, session)
+    user = await authenticate_user(form_data.username, form_data.password, session)
     if not user:
         raise HTTPException(status_code=400, detail="Incorrect username or password")
     
     # Access token court
     access_token_expires = timedelta(minutes=config.ACCESS_TOKEN_EXPIRE_MINUTES)
-    user_scopes = get_role_by_username(session, form_data.username)  # renvoie ["admin"] ou ["user"]
     access_token = create_access_token(
-        data={"sub": user.username, "scopes": user_scopes},
+        data=build_access_token_data(user),
         expires_delta=access_token_expires,
     )
 
     # Refresh token longue durée
     refresh_token_expires = timedelta(days=7)
     refresh_token = create_refresh_token(
-        data={"sub": user.username},
+        data={"sub": user.username, "ver": user.token_version},
         expires_delta=refresh_token_expires
     )
 
@@ -83,26 +94,28 @@ async def login_for_access_token(
 #-------------------------------
 
 @router.post("/token/refresh", response_model=Token)
-async def refresh_access_token(refresh_token: str, session: Session = Depends(get_session)):
+async def refresh_access_token(refresh_token: str, session: AsyncSession = Depends(get_async_session)):
     try:
-        payload = jwt.decode(refresh_token, config.SECRET_KEY, algorithms=[config.ALGORITHM])
-        username = payload.get("sub")
+        token_data = decode_token_data(refresh_token)
+        username = token_data.username
+        token_version = token_data.token_version
     
         if not username:
             raise HTTPException(status_code=401, detail="Refresh token invalide")
-    except JWTError:
+    except InvalidTokenError:
         raise HTTPException(status_code=401, detail="Refresh token invalide")
 
     # Vérifier que l'utilisateur existe toujours
-    user = get_user_by_username(session, username)
+    user = await get_user_by_username(session, username)
     if not user:
         raise HTTPException(status_code=401, detail="Utilisateur introuvable")
+    if token_version is not None and token_version != user.token_version:
+        raise HTTPException(status_code=401, detail="Refresh token révoqué")
 
     # Créer un nouvel access token
     access_token_expires = timedelta(minutes=config.ACCESS_TOKEN_EXPIRE_MINUTES)
-    user_scopes = get_role_by_username(session, username)
     access_token = create_access_token(
-        data={"sub": user.username, "scopes": user_scopes},
+        data=build_access_token_data(user),
         expires_delta=access_token_expires
     )
 
@@ -120,20 +133,16 @@ async def refresh_access_token(refresh_token: str, session: Session = Depends(ge
 @router.put("/roles")
 async def update_user_roles(
     user_id: UUID,
-    new_roles: str,
+    new_roles: Role,
     current_user: Annotated[User, Security(get_current_user, scopes=["admin"])],
-    db: Session = Depends(get_session)
+    db: AsyncSession = Depends(get_async_session)
 ):
-    user = get_user_by_id(db, user_id)
+    user = await get_user_by_id(db, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    allowed_roles = ["admin", "user"]
-    if new_roles not in allowed_roles:
-        raise HTTPException(status_code=400, detail="Invalid role")
-    
     user.role = new_roles
-    db.commit()
-    db.refresh(user)
+    # Le changement de rôle révoque les jetons existants (scopes périmés)
+    await revoke_user_tokens(db, user)
 
     return {"msg": "User roles updated successfully", "user": user.username, "roles": user.role}
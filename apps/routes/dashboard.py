@@ -0,0 +1,22 @@
+from fastapi import APIRouter, Depends, Security
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import Annotated
+from apps.models.models import User
+from database import get_async_session
+from crud.auth import get_current_user
+from crud.counts import get_counts
+from services.cache_service.counters import TRACKED
+
+router = APIRouter(prefix="/dashboard", tags=["dashboard"])
+
+
+# -------------------------------
+# TOTAUX (EXACTS, ESTIMÉS OU EN CACHE)
+# -------------------------------
+@router.get("/counts")
+async def read_counts(
+    current_user: Annotated[User, Security(get_current_user, scopes=["admin"])],
+    session: AsyncSession = Depends(get_async_session),
+):
+    # Chaque total porte son indicateur de fraîcheur (staleness)
+    return {name: (await get_counts(session, name)).snapshot() for name in TRACKED}
@@ -0,0 +1,112 @@
+from fastapi import APIRouter, Depends, Security
+from typing import Annotated
+from apps.models.models import User
+from crud.auth import get_current_user
+from services.auth_service.auth import hashing_pool, token_versions
+from services.auth_service.token_codec import verified_tokens
+from database import engine, async_engine, sql_tracer, get_async_session
+from services.cache_service.package_catalog import package_catalog
+from services.cache_service.invalidation import invalidation_bus
+from services.payement_service.cinetpay_client import cinetpay_client
+from services.payement_service.verification_cache import verifications
+from services.payement_service.notification_inbox import notification_inbox
+from services.payement_service.reconciliation import reconciler
+from sqlmodel.ext.asyncio.session import AsyncSession
+from crud.notification import inbox_backlog
+from apps.config.db_pool import pool_stats
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+
+# -------------------------------
+# POOL DE HACHAGE DES MOTS DE PASSE
+# -------------------------------
+@router.get("/password-hashing")
+async def read_password_hashing_metrics(
+    current_user: Annotated[User, Security(get_current_user, scopes=["admin"])],
+):
+    return hashing_pool.stats()
+
+
+# -------------------------------
+# AUTHENTIFICATION (CACHES)
+# -------------------------------
+@router.get("/auth")
+async def read_auth_metrics(
+    current_user: Annotated[User, Security(get_current_user, scopes=["admin"])],
+):
+    return {"token_versions": token_versions.stats(), "verified_tokens": verified_tokens.stats()}
+
+
+# -------------------------------
+# POOLS DE CONNEXIONS BASE DE DONNÉES
+# -------------------------------
+@router.get("/db-pool")
+async def read_db_pool_metrics(
+    current_user: Annotated[User, Security(get_current_user, scopes=["admin"])],
+):
+    return {
+        "sync": pool_stats(engine.pool),
+        "async": pool_stats(async_engine.sync_engine.pool),
+    }
+
+
+# -------------------------------
+# REQUÊTES SQL (LENTES / ÉCHANTILLONNÉES)
+# -------------------------------
+@router.get("/sql")
+async def read_sql_metrics(
+    current_user: Annotated[User, Security(get_current_user, scopes=["admin"])],
+):
+    return sql_tracer.stats()
+
+
+# -------------------------------
+# CATALOGUE DES PACKAGES (CACHE)
+# -------------------------------
+@router.get("/package-catalog")
+async def read_package_catalog_metrics(
+    current_user: Annotated[User, Security(get_current_user, scopes=["admin"])],
+):
+    return package_catalog.stats()
+
+
+# -------------------------------
+# BUS D'INVALIDATION (LISTEN/NOTIFY)
+# -------------------------------
+@router.get("/cache-bus")
+async def read_cache_bus_metrics(
+    current_user: Annotated[User, Security(get_current_user, scopes=["admin"])],
+):
+    return invalidation_bus.stats()
+
+
+# -------------------------------
+# PASSERELLE CINETPAY (CLIENT HTTP)
+# -------------------------------
+@router.get("/cinetpay")
+async def read_cinetpay_metrics(
+    current_user: Annotated[User, Security(get_current_user, scopes=["admin"])],
+):
+    return {**cinetpay_client.stats(), "verifications": verifications.stats()}
+
+
+# -------------------------------
+# BOÎTE DE RÉCEPTION DES WEBHOOKS DE PAIEMENT
+# -------------------------------
+@router.get("/payment-inbox")
+async def read_payment_inbox_metrics(
+    current_user: Annotated[User, Security(get_current_user, scopes=["admin"])],
+    session: AsyncSession = Depends(get_async_session),
+):
+    return {"backlog": await inbox_backlog(session), "workers": notification_inbox.stats()}
+
+
+# -------------------------------
+# RÉCONCILIATION DES TRANSACTIONS PENDING
+# -------------------------------
+@router.get("/reconciliation")
+async def read_reconciliation_metrics(
+    current_user: Annotated[User, Security(get_current_user, scopes=["admin"])],
+):
+    return reconciler.stats()
@@ -1,78 +1,95 @@
-from fastapi import APIRouter, Depends
-from sqlmodel import Session
-from database import get_session
+from fastapi import APIRouter, Depends, Request, Response
+from sqlmodel.ext.asyncio.session import AsyncSession
+from fastapi.concurrency import run_in_threadpool
+from database import get_async_session
 from services.service_mikrotik.mikrotik import MikroTikProfileCreator
-from crud.package import get_unsynced_packages, sync_package
+from crud.package import get_unsynced_packages, sync_package, get_package_catalog, catalog_page
 from apps.models.models import Package
+from apps.models.enums import Statut
 from schema.package import PackageCreate, PackageReadSimple, PackageUpdate
-from typing import Annotated, List
+from typing import Annotated, List, Optional
 from fastapi import Query, HTTPException
 from sqlmodel import select
 from uuid import UUID
 from config import config
+from schema.pagination import Page
+from services.cache_service.invalidation import invalidation_bus
+from services.cache_service.http_cache import conditional, make_etag
 router = APIRouter(prefix="/packages", tags=["Packages"])
 
 @router.post("/sync")
-async def sync_all_packages(session: Session = Depends(get_session), package_id: UUID = Query(..., description="ID of the package to sync")):
-    creator = MikroTikProfileCreator(config.mikrotik_host, config.mikrotik_user, config.mikrotik_password)
-    unsynced = get_unsynced_packages(Depends(get_session), package_id)
+async def sync_all_packages(session: AsyncSession = Depends(get_async_session), package_id: UUID = Query(..., description="ID of the package to sync")):
+    creator = await run_in_threadpool(MikroTikProfileCreator, config.mikrotik_host, config.mikrotik_user, config.mikrotik_password)
+    unsynced = await get_unsynced_packages(session, package_id)
     results = []
 
     for package in unsynced:
-        success = sync_package(Depends(get_session), package, creator)
+        success = await sync_package(session, package, creator)
         results.append({package.name: "✅" if success else "❌"})
 
     return {"results": results}
 
 @router.post("/add_package/", response_model=PackageReadSimple)
-async def create_hero(package: PackageCreate, session: Session = Depends(get_session)):
+async def create_hero(package: PackageCreate, session: AsyncSession = Depends(get_async_session)):
     db_package = Package.model_validate(package)
-    if session.exec(select(Package).where(Package.name == db_package.name)).first():
+    if (await session.exec(select(Package).where(Package.name == db_package.name))).first():
         raise HTTPException(status_code=400, detail="Package with this name already exists")    
     session.add(db_package)
-    session.commit()
-    session.refresh(db_package)
+    await invalidation_bus.publish(session, "package", db_package.id)
+    await session.commit()
+    await session.refresh(db_package)
     return db_package
 
-@router.get("/get_package/", response_model=list[PackageReadSimple])
+@router.get("/get_package/", response_model=Page[PackageReadSimple])
 async def read_heroes(
-    session: Session = Depends(get_session),
-    offset: int = 0,
-    limit: Annotated[int, Query(le=100)] = 100,
+    request: Request,
+    response: Response,
+    session: AsyncSession = Depends(get_async_session),
+    cursor: Optional[str] = None,
+    limit: Annotated[int, Query(ge=1, le=100)] = 100,
 ):
-    packages = session.exec(
-        select(Package).where(Package.statut != "delete").offset(offset).limit(limit)
-    ).all()
-    return packages
+    # Servi depuis le catalogue en mémoire, paginé par nom
+    catalog = await get_package_catalog(session)
+    not_modified = conditional(request, response, "packages", make_etag(catalog.digest, cursor, limit))
+    if not_modified:
+        return not_modified
+    return catalog_page(catalog, cursor, limit)
 
 @router.get("/package/{package_id}", response_model=PackageReadSimple)
-def read_package(package_id: UUID, session: Session = Depends(get_session)):
-    package = session.get(Package, package_id)
-    if not package or package.statut == "delete":
+async def read_package(
+    package_id: UUID, request: Request, response: Response, session: AsyncSession = Depends(get_async_session)
+):
+    package = (await get_package_catalog(session)).by_id.get(package_id)
+    if not package:
         raise HTTPException(status_code=404, detail="package not found")
+    not_modified = conditional(request, response, "package", make_etag(package))
+    if not_modified:
+        return not_modified
     return package
 
 @router.patch("/package/{package_id}", response_model=PackageReadSimple)
-def update_hero(package_id: UUID, hero: PackageUpdate, session: Session = Depends(get_session)):
-    package_db = session.get(Package, package_id)
-    if not package_db or package_db.statut == "delete":
+async def update_hero(package_id: UUID, hero: PackageUpdate, session: AsyncSession = Depends(get_async_session)):
+    package_db = await session.get(Package, package_id)
+    if not package_db or package_db.statut == Statut.DELETED:
         raise HTTPException(status_code=404, detail="package not found")
     if hero.name and hero.name != package_db.name:
-        if session.exec(select(Package).where(Package.name == hero.name)).first():
+        if (await session.exec(select(Package).where(Package.name == hero.name))).first():
             raise HTTPException(status_code=400, detail="Package with this name already exists")
     hero_data = hero.model_dump(exclude_unset=True)
     package_db.sqlmodel_update(hero_data)
     session.add(package_db)
-    session.commit()
-    session.refresh(package_db)
+    await invalidation_bus.publish(session, "package", package_id)
+    await session.commit()
+    await session.refresh(package_db)
     return package_db
 
 @router.delete("/package/{package_id}")
-def delete_hero(package_id: UUID, session: Session = Depends(get_session)):
-    package = session.get(Package, package_id)
+async def delete_hero(package_id: UUID, session: AsyncSession = Depends(get_async_session)):
+    package = await session.get(Package, package_id)
     if not package:
         raise HTTPException(status_code=404, detail="package not found")
-    package.statut = "deleted"
+    package.statut = Statut.DELETED
     session.add(package)
-    session.commit()
+    await invalidation_bus.publish(session, "package", package_id)
+    await session.commit()
     return {"ok": True}
@@ -1,49 +1,48 @@
 # routes/payments.py
 import uuid
 from fastapi import APIRouter, Depends, Form, Header, BackgroundTasks
-from sqlmodel import Session
-from database import get_session
-from crud.transaction import create_transaction, get_transaction_by_txid , get_user_email_by_user_id , update_transaction_status,get_email_by_transaction_id
-from services.payement_service.cinetpay_service import initialize_payment, verify_transaction
+from sqlmodel.ext.asyncio.session import AsyncSession
+from database import get_async_session
+from crud.transaction import create_transaction, get_transaction_by_txid , get_user_email_by_user_id ,get_email_by_transaction_id
+from services.payement_service.cinetpay_service import initialize_payment
 from services.payement_service.notification_service import send_payment_confirmation_email
 from uuid import UUID
 from fastapi import HTTPException
-from services.service_mikrotik.mikrotik import MikroTikProfileCreator, generate_nhr_code
-from  config import config
 from apps.models.models import User
+from apps.models.enums import PaymentStatus
 from typing import Annotated
 from fastapi import Security
 from crud.auth import get_current_user
-from crud.voucher import create_voucher
-from schema.voucher import VoucherCreate
-from crud.voucher import create_voucher
-from schema.voucher import VoucherCreate
+from crud.notification import record_notification
+from services.payement_service.fulfilment import MissingDeliveryProfile, issue_voucher
+from services.payement_service.notification_inbox import notification_inbox
+from services.payement_service.reconciliation import reconciler
 
 router = APIRouter(prefix="/payments", tags=["payments"])
 
 
 @router.post("/init")
-def init_payment(
+async def init_payment(
     user_id: UUID,
     package_id: UUID,
     amount: float = 0.0,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     payment_method: str = Form(...),  # "cinetpay" ou autre
 ):
     # a) Créer ton transaction_id unique (côté marchand)
     txid = f"TX-{uuid.uuid4().hex[:16]}"
 
     # b) Enregistrer la transaction en attente côté DB
-    create_transaction(
+    await create_transaction(
         session,
         transaction_id=txid,
         user_id=user_id,
         amount=amount,
         package_id=package_id,
         payment_method=payment_method,
-        status="PENDING",
+        status=PaymentStatus.PENDING,
     )
-    customer_email = get_user_email_by_user_id(session, user_id)
+    customer_email = await get_user_email_by_user_id(session, user_id)
 
     # c) Construire le payload pour CinetPay
     data = {
@@ -64,7 +63,7 @@ def init_payment(
     "payment_method": "ORANGE_MONEY"         # exemple, choisir celui accepté
 }
     # d) Appel SDK → reçoit les infos pour rediriger le client
-    cp_response = initialize_payment(data)
+    cp_response = await initialize_payment(data)
 
     # e) Retourner la réponse CinetPay (URL/Token) au front
     return {"transaction_id": txid, "cinetpay": cp_response, "email": customer_email}
@@ -77,87 +76,17 @@ def notify_ping():
 
 # 8.3 POST /notify → notification de paiement (webhook)
 @router.post("/notify")
-def notify_payment(
-    background_tasks: BackgroundTasks,
+async def notify_payment(
     cpm_site_id: str = Form(...),     
     cpm_trans_id: str = Form(...),   
     x_token: str = Header(...),       
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
-    # 1) Vérifier que la transaction existe localement
-    tx = get_transaction_by_txid(session, cpm_trans_id)
-    if not tx:
-        # Transaction inconnue → on répond 200 pour éviter les retries infinis
-        return {"status": "IGNORED", "reason": "transaction not found"}
-
-    # 2) Idempotence
-    if tx.payment_status == "ACCEPTED":
-        return {"status": "ALREADY_ACCEPTED"}
-
-    # 3) Vérifier l’état côté CinetPay
-    cp_status = verify_transaction(cpm_trans_id, session)
-    if not isinstance(cp_status, dict):
-        raise HTTPException(status_code=502, detail="Réponse CinetPay invalide")
-
-    data = cp_status.get("data") or {}
-    if not data:
-        raise HTTPException(status_code=404, detail="Impossible d'accéder à CinetPay")
-
-    status = data.get("status")
-    method = data.get("payment_method")
-    transaction_id = data.get("transaction_id")
-
-    # 4) Mise à jour locale
-    if status == "ACCEPTED":
-        update_transaction_status(session, cpm_trans_id, "ACCEPTED", method=method)
-          # 5) Génération du voucher MikroTik
-        try:
-            if not tx.package or not tx.package.mikrotik_profile_name:
-                raise HTTPException(status_code=500, detail="Package ou profil MikroTik manquant")
-            voucher_code = generate_nhr_code()  
-            profile_name = tx.package.mikrotik_profile_name  
-            mikrotik_service = MikroTikProfileCreator(host=config.mikrotik_host, username=config.mikrotik_user, password=config.mikrotik_password)
-            created_voucher = mikrotik_service.create_voucher(
-                code=voucher_code,
-                profile_name=profile_name
-            )
-            # Créer un objet VoucherCreate
-            voucher_data = VoucherCreate(
-                username_voucher=created_voucher,           
-                password_voucher=created_voucher,  # ou un mot de passe différent
-                user_id=tx.user_id,
-                package_id=tx.package_id
-            )
-            # Appeler la fonction CRUD pour enregistrer en base
-            db_voucher = create_voucher(session=session, voucher_data=voucher_data)
-
-
-        except HTTPException as e:
-            # En cas d'erreur MikroTik, on peut logger et continuer ou renvoyer une erreur
-            raise e
-
-        # 5) Email utilisateur
-        customer_email = get_email_by_transaction_id(session, cpm_trans_id)
-
-        if customer_email:
-            background_tasks.add_task(
-                send_payment_confirmation_email,
-                to_email=customer_email,
-                amount=tx.amount_paid,  # montant attendu
-                txid=tx.payment_gateway_ref,
-                 voucher_code=created_voucher  
-            )
-
-        # TODO: deliver_wifi_service(user_id=tx.user_id, package_id=tx.package_id)
-        return {"status": "OK", "updated": "ACCEPTED"}
-
-    elif status == "REFUSED":
-        update_transaction_status(session, cpm_trans_id, "REFUSED", method=method)
-        return {"status": "OK", "updated": "REFUSED"}
-
-    else:
-        update_transaction_status(session, cpm_trans_id, status or "PENDING", method=method)
-        return {"status": "OK", "updated": status or "PENDING"}
+    # Accusé de réception immédiat : la notification est enregistrée puis traitée
+    # par les workers de la boîte de réception (vérification CinetPay, voucher, email)
+    await record_notification(session, cpm_trans_id, cpm_site_id)
+    notification_inbox.wake()
+    return {"status": "RECEIVED"}
 
 # 9. Endpoint d’activation manuelle (admin)
 
@@ -166,55 +95,40 @@ async def activate_forfait(
     transaction_id: str,
     background_tasks: BackgroundTasks,
     current_user: Annotated[User, Security(get_current_user, scopes=["admin"])],
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
 ):
    
-    tx = get_transaction_by_txid(session, transaction_id)
+    tx = await get_transaction_by_txid(session, transaction_id)
     if not tx:
         raise HTTPException(status_code=404, detail="Transaction non trouvée")
 
-    # Mettre à jour le statut à ACCEPTED
-    update_transaction_status(session, transaction_id, "ACCEPTED", method="MANUAL")
-
-    # Vérification du package et du profil MikroTik
-    if not tx.package or not tx.package.mikrotik_profile_name:
+    # Statut ACCEPTED et voucher en une fois, sous verrou (une seule émission par transaction)
+    try:
+        issued = await issue_voucher(session, transaction_id, method="MANUAL")
+    except MissingDeliveryProfile:
         raise HTTPException(status_code=500, detail="Package ou profil MikroTik manquant")
+    if issued is None:
+        raise HTTPException(status_code=404, detail="Transaction non trouvée")
 
-    # Générer le voucher
-    voucher_code = generate_nhr_code()
-    mikrotik_service = MikroTikProfileCreator(
-        host=config.mikrotik_host,
-        username=config.mikrotik_user,
-        password=config.mikrotik_password
-    )
-    created_voucher = mikrotik_service.create_voucher(
-        code=voucher_code,
-        profile_name=tx.package.mikrotik_profile_name
-    )
-    
-
-
-# Créer un objet VoucherCreate
-    voucher_data = VoucherCreate(
-        username_voucher=created_voucher,
-        password_voucher=created_voucher,  # ou un mot de passe différent
-        user_id=tx.user_id,
-        package_id=tx.package_id
-    )
-
-# Appeler la fonction CRUD pour enregistrer en base
-    db_voucher = create_voucher(session=session, voucher_data=voucher_data)
-
-
-    # Envoyer l'email à l'utilisateur
-    customer_email = get_email_by_transaction_id(session, transaction_id)
+    # Envoyer l'email à l'utilisateur (seulement à la première émission)
+    customer_email = await get_email_by_transaction_id(session, transaction_id) if issued.created else None
     if customer_email:
         background_tasks.add_task(
             send_payment_confirmation_email,
             to_email=customer_email,
             amount=tx.amount_paid or 0.0,
             txid=tx.payment_gateway_ref or "MANUAL",
-            voucher_code=created_voucher
+            voucher_code=issued.code
         )
 
-    return {"status": "OK", "voucher": created_voucher, "updated": "ACCEPTED"}
+    return {"status": "OK", "voucher": issued.code, "updated": "ACCEPTED"}
+
+
+# 10. Réconciliation immédiate des transactions PENDING (admin)
+@router.post("/reconcile", status_code=202)
+async def trigger_reconciliation(
+    current_user: Annotated[User, Security(get_current_user, scopes=["admin"])],
+):
+    # La passe tourne dans la tâche de fond ; suivi via /metrics/reconciliation
+    reconciler.wake()
+    return {"status": "SCHEDULED", "running": reconciler.running}
@@ -1,13 +1,23 @@
-from fastapi import FastAPI, HTTPException, Depends
-from sqlmodel import select
-from typing import List, Optional
+from fastapi import FastAPI, HTTPException, Depends, Query, Security
+from fastapi.responses import StreamingResponse
+from sqlmodel.ext.asyncio.session import AsyncSession
+from datetime import datetime
+from typing import Annotated, List, Literal, Optional
 from uuid import UUID
-from database import get_session
-from schema.transaction import  TransactionCreate, TransactionReadSimple, TransactionReadDetail, TransactionUpdate
-from apps.models.models import Transaction
+from database import get_async_session, AsyncSessionLocal
+from config import config
+from schema.transaction import  TransactionCreate, TransactionReadSimple, TransactionReadDetail, TransactionUpdate, TransactionFilter
+from schema.pagination import Page, projection
+from apps.models.models import Transaction, User, naive_utc
+from apps.models.enums import PaymentStatus, Statut
 from fastapi import APIRouter
 from crud.user import get_user_by_id
 from crud.package import get_package_by_id
+from crud.auth import get_current_user
+from crud.transaction import EXPORT_COLUMNS, stream_transactions, transaction_export_query, transaction_list_filters
+from crud.pagination import paginate_columns, parse_fields
+from services.export_service.fast_json import FastJSONResponse
+from services.export_service.formats import csv_chunk, csv_header, ndjson_chunk
 
 router = APIRouter(prefix="/transaction", tags=["transaction"],)
 
@@ -15,33 +25,77 @@ router = APIRouter(prefix="/transaction", tags=["transaction"],)
 # Create transaction
 # ------------------------
 @router.post("/transactions/", response_model=TransactionReadDetail)
-def create_transaction(transaction: TransactionCreate, session=Depends(get_session)):
-    if not transaction.user_id or not get_user_by_id(session, transaction.user_id):
+async def create_transaction(transaction: TransactionCreate, session: AsyncSession = Depends(get_async_session)):
+    if not transaction.user_id or not await get_user_by_id(session, transaction.user_id):
         raise HTTPException(status_code=400, detail="Invalid or missing user_id")
 
     # Vérifier que package_id existe
-    if not transaction.package_id or not get_package_by_id(session, transaction.package_id):
+    if not transaction.package_id or not await get_package_by_id(session, transaction.package_id):
         raise HTTPException(status_code=400, detail="Invalid or missing package_id")
     db_transaction = Transaction.model_validate(transaction)
     session.add(db_transaction)
-    session.commit()
-    session.refresh(db_transaction)
+    await session.commit()
+    await session.refresh(db_transaction)
     return db_transaction
 
 # ------------------------
 # Read all transactions (simple)
 # ------------------------
-@router.get("/transactions/", response_model=List[TransactionReadSimple])
-def read_transactions(session=Depends(get_session)):
-    transactions = session.exec(select(Transaction)).all()
-    return transactions
+@router.get("/transactions/", response_model=Page[projection(TransactionReadSimple)])
+async def read_transactions(
+    filters: Annotated[TransactionFilter, Query()],
+    session: AsyncSession = Depends(get_async_session),
+):
+    # Chaque filtre a son index (colonne, created_at) : la première page ne lit que `limit` lignes
+    page = await paginate_columns(
+        session,
+        Transaction,
+        parse_fields(filters.fields, TransactionReadSimple),
+        transaction_list_filters(filters),
+        (Transaction.created_at, Transaction.id),
+        filters.cursor,
+        filters.limit,
+        descending=filters.sort.startswith("-"),
+    )
+    return FastJSONResponse(page)
+
+# ------------------------
+# Export transactions (NDJSON / CSV, en flux)
+# ------------------------
+@router.get("/transactions/export")
+async def export_transactions(
+    current_user: Annotated[User, Security(get_current_user, scopes=["admin"])],
+    format: Literal["ndjson", "csv"] = "ndjson",
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    status: Annotated[Optional[List[PaymentStatus]], Query()] = None,
+):
+    created_from, created_to = naive_utc(created_from), naive_utc(created_to)
+    if created_from and created_to and created_from >= created_to:
+        raise HTTPException(status_code=400, detail="created_from must be before created_to")
+    stmt = transaction_export_query(created_from, created_to, status)
+    columns = [column.key for column in EXPORT_COLUMNS]
+
+    async def body():
+        # Session propre au flux : celle de la dépendance est fermée avant l'envoi du corps
+        async with AsyncSessionLocal() as session:
+            if format == "csv":
+                yield csv_header(columns)
+            async for rows in stream_transactions(session, stmt, config.export_batch_size):
+                yield csv_chunk(rows) if format == "csv" else ndjson_chunk(columns, rows)
+
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    filename = f"transactions.{format}"
+    return StreamingResponse(
+        body(), media_type=media_type, headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
 
 # ------------------------
 # Read transaction by ID (detail)
 # ------------------------
 @router.get("/transactions/{transaction_id}", response_model=TransactionReadDetail)
-def read_transaction(transaction_id: UUID, session=Depends(get_session)):
-    transaction = session.get(Transaction, transaction_id)
+async def read_transaction(transaction_id: UUID, session: AsyncSession = Depends(get_async_session)):
+    transaction = await session.get(Transaction, transaction_id)
     if not transaction:
         raise HTTPException(status_code=404, detail="Transaction not found")
     return transaction
@@ -50,9 +104,9 @@ def read_transaction(transaction_id: UUID, session=Depends(get_session)):
 # Update transaction
 # ------------------------
 @router.patch("/transactions/{transaction_id}", response_model=TransactionReadDetail)
-def update_transaction(transaction_id: UUID, transaction_update: TransactionUpdate, session=Depends(get_session)):
-    transaction = session.get(Transaction, transaction_id)
-    if not transaction or transaction.statut == "delete":
+async def update_transaction(transaction_id: UUID, transaction_update: TransactionUpdate, session: AsyncSession = Depends(get_async_session)):
+    transaction = await session.get(Transaction, transaction_id)
+    if not transaction or transaction.statut == Statut.DELETED:
         raise HTTPException(status_code=404, detail="Transaction not found")
     
     update_data = transaction_update.model_dump(exclude_unset=True)
@@ -60,19 +114,19 @@ def update_transaction(transaction_id: UUID, transaction_update: TransactionUpda
         setattr(transaction, key, value)
     
     session.add(transaction)
-    session.commit()
-    session.refresh(transaction)
+    await session.commit()
+    await session.refresh(transaction)
     return transaction
 
 # ------------------------
 # Delete transaction
 # ------------------------
 @router.delete("/transactions/{transaction_id}")
-def delete_transaction(transaction_id: UUID, session=Depends(get_session)):
-    transaction = session.get(Transaction, transaction_id)
+async def delete_transaction(transaction_id: UUID, session: AsyncSession = Depends(get_async_session)):
+    transaction = await session.get(Transaction, transaction_id)
     if not transaction:
         raise HTTPException(status_code=404, detail="Transaction not found")
-    transaction.statut = "deleted"
+    transaction.statut = Statut.DELETED
     session.add(transaction)
-    session.commit()
+    await session.commit()
     return {"ok": True}
@@ -1,20 +1,25 @@
 # routers/user.py
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from uuid import UUID
-from typing import Annotated, List
-from database import get_session
-from apps.models.models import User
+from typing import Annotated, Optional
+from database import get_async_session
+from apps.models.models import User, Transaction, Package, Voucher, live
+from apps.models.enums import Statut
 from schema.user import UserCreate, UserReadSimple, UserUpdate
-from services.auth_service.auth import get_password_hash
+from services.auth_service.auth import get_password_hash_async
 from fastapi import Security
 from crud.auth import get_current_user  
-from crud.user import get_user_by_id
-from services.auth_service.auth import get_password_hash
-from fastapi import Security
+from crud.user import get_user_by_id, ensure_user_exists
+from services.auth_service.auth import revoke_user_tokens
+from services.cache_service.invalidation import invalidation_bus
 from schema.voucher import VoucherReadSimple
 from schema.transaction import TransactionReadSimple
-from schema.package import PackageReadSimple    
+from schema.package import PackageReadSimple
+from crud.pagination import paginate, paginate_columns, parse_fields
+from services.export_service.fast_json import FastJSONResponse
+from schema.pagination import Page, projection
 
 router = APIRouter(prefix="/users", tags=["Users"],)
 
@@ -22,8 +27,8 @@ router = APIRouter(prefix="/users", tags=["Users"],)
 # CREATE
 # -------------------------------
 @router.post("/add_user/", response_model=UserReadSimple,)
-async def create_user(user: UserCreate, session: Session = Depends(get_session)):
-    hashed_password = get_password_hash(user.password)
+async def create_user(user: UserCreate, session: AsyncSession = Depends(get_async_session)):
+    hashed_password = await get_password_hash_async(user.password)
 
     db_user = User(
         username=user.username,
@@ -32,29 +37,33 @@ async def create_user(user: UserCreate, session: Session = Depends(get_session))
         numero=user.numero
     )
     session.add(db_user)
-    session.commit()
-    session.refresh(db_user)
+    await session.commit()
+    await session.refresh(db_user)
     return db_user
 
 # -------------------------------
 # READ LIST
 # -------------------------------
-@router.get("/get_users/", response_model=List[User])
-def read_users(
-    session: Session = Depends(get_session),
-    offset: int = 0,
-    limit: Annotated[int, Query(le=100)] = 100
+@router.get("/get_users/", response_model=Page[projection(UserReadSimple)])
+async def read_users(
+    session: AsyncSession = Depends(get_async_session),
+    cursor: Optional[str] = None,
+    limit: Annotated[int, Query(ge=1, le=100)] = 100,
+    fields: Annotated[Optional[str], Query(description="Champs à renvoyer, séparés par des virgules ; les autres sont omis")] = None,
 ):
-    users = session.exec(select(User).offset(offset).limit(limit)).all()
-    return users
+    # Pagination par clé (index ix_user_live_created_at) : coût constant quelle que soit la page
+    page = await paginate_columns(
+        session, User, parse_fields(fields, UserReadSimple), [live(User)], (User.created_at, User.id), cursor, limit
+    )
+    return FastJSONResponse(page)
 
 # -------------------------------
 # READ SINGLE
 # -------------------------------
 @router.get("/user/{user_id}", response_model=UserReadSimple)
-def read_user(user_id: UUID, session: Session = Depends(get_session)):
-    user = session.get(User, user_id)
-    if not user or user.statut == "delete":
+async def read_user(user_id: UUID, session: AsyncSession = Depends(get_async_session)):
+    user = await session.get(User, user_id)
+    if not user or user.statut == Statut.DELETED:
         raise HTTPException(status_code=404, detail="User not found")
     return user
 
@@ -62,62 +71,88 @@ def read_user(user_id: UUID, session: Session = Depends(get_session)):
 # UPDATE
 # -------------------------------
 @router.patch("/user/{user_id}", response_model=UserReadSimple)
-def update_user(user_id: UUID, user_update: UserUpdate, session: Session = Depends(get_session)):
-    db_user = session.get(User, user_id)
-    if not db_user or db_user.statut == "delete":
+async def update_user(user_id: UUID, user_update: UserUpdate, session: AsyncSession = Depends(get_async_session)):
+    db_user = await session.get(User, user_id)
+    if not db_user or db_user.statut == Statut.DELETED:
         raise HTTPException(status_code=404, detail="User not found")
     
     update_data = user_update.model_dump(exclude_unset=True)
     for key, value in update_data.items():
             setattr(db_user, key, value )
 
+    if "username" in update_data:
+        # Le claim "sub" des jetons existants ne correspond plus
+        await revoke_user_tokens(session, db_user)
+        return db_user
     session.add(db_user)
-    session.commit()
-    session.refresh(db_user)
+    await invalidation_bus.publish(session, "user", user_id)
+    await session.commit()
+    await session.refresh(db_user)
     return db_user
 
 # -------------------------------
 # DELETE
 # -------------------------------
 @router.delete("/user/{user_id}")
-async def delete_user(user_id: UUID, session: Session = Depends(get_session)):
-    db_user = session.get(User, user_id)
-    if not db_user or db_user.statut == "delete":
+async def delete_user(user_id: UUID, session: AsyncSession = Depends(get_async_session)):
+    db_user = await session.get(User, user_id)
+    if not db_user or db_user.statut == Statut.DELETED:
         raise HTTPException(status_code=404, detail="User not found")
-    db_user.statut = "delete"
-    session.add(db_user)
-    session.commit()
+    db_user.statut = Statut.DELETED
+    await revoke_user_tokens(session, db_user)
     return {"ok": True}
  
+# Relations d'un utilisateur : deux requêtes par appel (existence + page), quel que soit le volume
+
 # ------------------------
 # Get all vouchers of a user
 # ------------------------
-@router.get("/{user_id}/vouchers", response_model=List[VoucherReadSimple])
-def get_user_vouchers(user_id: UUID, session: Session = Depends(get_session)):
-    user = session.get(User, user_id)
-    if not user or user.statut == "delete":
-        raise HTTPException(status_code=404, detail="User not found")
-    return user.vouchers
+@router.get("/{user_id}/vouchers", response_model=Page[VoucherReadSimple])
+async def get_user_vouchers(
+    user_id: UUID,
+    session: AsyncSession = Depends(get_async_session),
+    cursor: Optional[str] = None,
+    limit: Annotated[int, Query(ge=1, le=100)] = 100,
+):
+    await ensure_user_exists(session, user_id)
+    where = [Voucher.user_id == user_id, live(Voucher)]
+    page = await paginate_columns(
+        session, Voucher, list(VoucherReadSimple.model_fields), where, (Voucher.generated_at, Voucher.id), cursor, limit,
+        descending=True,
+    )
+    return FastJSONResponse(page)
 
 # ------------------------
 # Get all transactions of a user
 # ------------------------
-@router.get("/{user_id}/transactions", response_model=List[TransactionReadSimple])
-def get_user_transactions(user_id: UUID, session: Session = Depends(get_session)):
-    user = session.get(User, user_id)
-    if not user or user.statut == "delete":
-        raise HTTPException(status_code=404, detail="User not found")
-    return user.transactions
+@router.get("/{user_id}/transactions", response_model=Page[TransactionReadSimple])
+async def get_user_transactions(
+    user_id: UUID,
+    session: AsyncSession = Depends(get_async_session),
+    cursor: Optional[str] = None,
+    limit: Annotated[int, Query(ge=1, le=100)] = 100,
+):
+    await ensure_user_exists(session, user_id)
+    # Index ix_transaction_user_id_created_at
+    where = [Transaction.user_id == user_id, live(Transaction)]
+    page = await paginate_columns(
+        session, Transaction, list(TransactionReadSimple.model_fields), where, (Transaction.created_at, Transaction.id),
+        cursor, limit, descending=True,
+    )
+    return FastJSONResponse(page)
 
 # ------------------------
 # Get all packages of a user (via transactions)
 # ------------------------
-@router.get("/{user_id}/packages", response_model=List[PackageReadSimple])
-def get_user_packages(user_id: UUID, session: Session = Depends(get_session)):
-    user = session.get(User, user_id)
-    if not user or user.statut == "delete":
-        raise HTTPException(status_code=404, detail="User not found")
-
-    # Récupère les packages achetés via les transactions
-    packages = [transaction.package for transaction in user.transactions if transaction.package]
-    return packages
+@router.get("/{user_id}/packages", response_model=Page[PackageReadSimple])
+async def get_user_packages(
+    user_id: UUID,
+    session: AsyncSession = Depends(get_async_session),
+    cursor: Optional[str] = None,
+    limit: Annotated[int, Query(ge=1, le=100)] = 100,
+):
+    await ensure_user_exists(session, user_id)
+    # Semi-jointure : chaque package acheté n'apparaît qu'une fois, sans charger les transactions
+    purchased = select(Transaction.package_id).where(Transaction.user_id == user_id, live(Transaction))
+    stmt = select(Package).where(Package.id.in_(purchased), live(Package))
+    return await paginate(session, stmt, (Package.name,), cursor, limit)
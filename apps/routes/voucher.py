@@ -1,32 +1,36 @@
 from fastapi import APIRouter, Depends, Query, HTTPException
-from sqlmodel import Session, select
-from typing import Annotated, List, Optional
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import Annotated, Optional
 from uuid import UUID
-from apps.config.database import get_session
-from apps.models.models import Voucher
+from database import get_async_session
+from apps.models.models import Voucher, live
+from apps.models.enums import Statut
 from schema.voucher import VoucherCreate, VoucherReadSimple, VoucherReadDetail
 from datetime import datetime
 from crud.user import get_user_by_id
 from crud.package import get_package_by_id
+from crud.pagination import paginate_columns, parse_fields
+from services.export_service.fast_json import FastJSONResponse
+from schema.pagination import Page, projection
 
 router = APIRouter(prefix="/vouchers", tags=["Vouchers"])
 
 # ------------------------
 # Create voucher
 @router.post("/vouchers/", response_model=VoucherReadDetail)
-async def create_voucher(voucher: VoucherCreate, session: Session = Depends(get_session)):
+async def create_voucher(voucher: VoucherCreate, session: AsyncSession = Depends(get_async_session)):
     # Vérifier que l'utilisateur existe
-    if not voucher.user_id or not get_user_by_id(session, voucher.user_id):
+    if not voucher.user_id or not await get_user_by_id(session, voucher.user_id):
         raise HTTPException(status_code=400, detail="Valid user_id is required")
     
     # Vérifier que le package existe
-    if not voucher.package_id or not get_package_by_id(session, voucher.package_id):
+    if not voucher.package_id or not await get_package_by_id(session, voucher.package_id):
         raise HTTPException(status_code=400, detail="Valid package_id is required")
 
     db_voucher = Voucher.model_validate(voucher)
     session.add(db_voucher)
-    session.commit()
-    session.refresh(db_voucher)
+    await session.commit()
+    await session.refresh(db_voucher)
 
     return db_voucher
 
@@ -34,22 +38,26 @@ async def create_voucher(voucher: VoucherCreate, session: Session = Depends(get_
 # ------------------------
 # Read all vouchers (simple)
 # ------------------------
-@router.get("/get_all/", response_model=List[VoucherReadSimple])
+@router.get("/get_all/", response_model=Page[projection(VoucherReadSimple)])
 async def read_vouchers(
-    session: Session = Depends(get_session),
-    offset: int = 0,
-    limit: Annotated[int, Query(le=100)] = 100,
+    session: AsyncSession = Depends(get_async_session),
+    cursor: Optional[str] = None,
+    limit: Annotated[int, Query(ge=1, le=100)] = 100,
+    fields: Annotated[Optional[str], Query(description="Champs à renvoyer, séparés par des virgules ; les autres sont omis")] = None,
 ):
-    vouchers = session.exec(select(Voucher).where(Voucher.statut!="delete").offset(offset).limit(limit)).all()
-    return vouchers
+    # Pagination par clé (index ix_voucher_live_generated_at) : coût constant quelle que soit la page
+    page = await paginate_columns(
+        session, Voucher, parse_fields(fields, VoucherReadSimple), [live(Voucher)], (Voucher.generated_at, Voucher.id), cursor, limit
+    )
+    return FastJSONResponse(page)
 
 # ------------------------
 # Read voucher by ID (detail)
 # ------------------------
 @router.get("/get/{voucher_id}", response_model=VoucherReadDetail)
-def read_voucher(voucher_id: UUID, session: Session = Depends(get_session)):
-    voucher = session.get(Voucher, voucher_id)
-    if not voucher or voucher.statut == "delete":
+async def read_voucher(voucher_id: UUID, session: AsyncSession = Depends(get_async_session)):
+    voucher = await session.get(Voucher, voucher_id)
+    if not voucher or voucher.statut == Statut.DELETED:
         raise HTTPException(status_code=404, detail="Voucher not found")
     return voucher
 
@@ -57,26 +65,26 @@ def read_voucher(voucher_id: UUID, session: Session = Depends(get_session)):
 # Update voucher (ex: activated_at)
 # ------------------------
 @router.patch("/update/{voucher_id}", response_model=VoucherReadDetail)
-def update_voucher(voucher_id: UUID, activated_at: Optional[datetime] = None, session: Session = Depends(get_session)):
-    voucher_db = session.get(Voucher, voucher_id)
-    if not voucher_db or voucher_db.statut == "delete":
+async def update_voucher(voucher_id: UUID, activated_at: Optional[datetime] = None, session: AsyncSession = Depends(get_async_session)):
+    voucher_db = await session.get(Voucher, voucher_id)
+    if not voucher_db or voucher_db.statut == Statut.DELETED:
         raise HTTPException(status_code=404, detail="Voucher not found")
     if activated_at:
         voucher_db.activated_at = activated_at
     session.add(voucher_db)
-    session.commit()
-    session.refresh(voucher_db)
+    await session.commit()
+    await session.refresh(voucher_db)
     return voucher_db
 
 # ------------------------
 # Delete voucher
 # ------------------------
 @router.delete("/delete/{voucher_id}")
-def delete_voucher(voucher_id: UUID, session: Session = Depends(get_session)):
-    voucher_db = session.get(Voucher, voucher_id)
-    if not voucher_db or voucher_db.statut == "delete":
+async def delete_voucher(voucher_id: UUID, session: AsyncSession = Depends(get_async_session)):
+    voucher_db = await session.get(Voucher, voucher_id)
+    if not voucher_db or voucher_db.statut == Statut.DELETED:
         raise HTTPException(status_code=404, detail="Voucher not found")
-    voucher_db.statut = "deleted"
+    voucher_db.statut = Statut.DELETED
     session.add(voucher_db)
-    session.commit()
+    await session.commit()
     return {"ok": True}
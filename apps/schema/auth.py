@@ -1,5 +1,7 @@
 from pydantic import BaseModel
 from typing import Optional
+from uuid import UUID
+from apps.models.enums import Role, Statut
 
 
 class Token(BaseModel):
@@ -11,12 +13,24 @@ class Token(BaseModel):
 class TokenData(BaseModel):
     username: str | None = None
     scopes: list[str] = []
+    user_id: UUID | None = None
+    role: str | None = None
+    statut: str | None = None
+    token_version: int | None = None
+
+
+class CurrentUser(BaseModel):
+    # Utilisateur reconstruit à partir des claims du jeton (mode sans état)
+    id: UUID
+    username: str
+    role: Role
+    statut: Statut
 
 
 class User(BaseModel):
     username: str
-    statut: str
-    role: str
+    statut: Statut
+    role: Role
     numero_telephone: str | None = None
 
     email: str | None = None
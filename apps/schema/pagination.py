@@ -0,0 +1,21 @@
+from functools import cache
+from typing import Generic, List, Optional, TypeVar
+from pydantic import BaseModel, create_model
+
+T = TypeVar("T")
+
+
+class Page(BaseModel, Generic[T]):
+    items: List[T]
+    next_cursor: Optional[str] = None  # à repasser en ?cursor= ; None sur la dernière page
+
+
+@cache
+def projection(schema: type[BaseModel]) -> type[BaseModel]:
+    # Élément d'une liste avec ?fields= : mêmes champs que `schema`, tous facultatifs,
+    # car seuls les champs demandés sont présents (tous si fields est absent)
+    return create_model(
+        f"{schema.__name__}Fields",
+        __doc__=f"Champs de {schema.__name__} ; ceux non demandés via ?fields= sont omis.",
+        **{name: (Optional[field.annotation], None) for name, field in schema.model_fields.items()},
+    )
@@ -1,14 +1,17 @@
-from typing import Optional
+from typing import Literal, Optional
+from pydantic import BaseModel, Field, field_validator, model_validator
 from sqlmodel import SQLModel
 from datetime import datetime,timezone
 from uuid import UUID, uuid4
+from apps.models.enums import PaymentStatus
+from apps.models.models import naive_utc
 
 
 
 class TransactionReadSimple(SQLModel):
     amount_paid: float
     payment_method: str 
-    payment_status: str 
+    payment_status: PaymentStatus 
     payment_gateway_ref: Optional[str] = None
     user_id: Optional[UUID] = None
     package_id: Optional[UUID] = None
@@ -21,7 +24,7 @@ class TransactionCreate(TransactionReadSimple):
 class TransactionUpdate(SQLModel):
     amount_paid: Optional[float] = None
     payment_method: Optional[str] = None
-    payment_status: Optional[str] = None
+    payment_status: Optional[PaymentStatus] = None
     payment_gateway_ref: Optional[str] = None
     user_id: Optional[int] = None
     package_id: Optional[int] = None
@@ -31,8 +34,35 @@ class TransactionReadDetail(SQLModel):
     id: UUID
     amount_paid: float
     payment_method: str 
-    payment_status: str 
+    payment_status: PaymentStatus 
     payment_gateway_ref: Optional[str] = None
     user_id: Optional[UUID] = None
     package_id: Optional[UUID] = None
     create_at : datetime
+
+
+class TransactionFilter(BaseModel):
+    # Paramètres de GET /transaction/transactions/ : uniquement des colonnes indexées
+    model_config = {"extra": "forbid"}
+
+    payment_status: Optional[PaymentStatus] = None
+    payment_method: Optional[str] = None
+    package_id: Optional[UUID] = None
+    user_id: Optional[UUID] = None
+    created_from: Optional[datetime] = None
+    created_to: Optional[datetime] = None
+    sort: Literal["created_at", "-created_at"] = "-created_at"
+    cursor: Optional[str] = None
+    limit: int = Field(default=50, ge=1, le=100)
+    fields: Optional[str] = None  # champs de TransactionReadSimple séparés par des virgules ; les autres sont omis
+
+    @field_validator("created_from", "created_to")
+    @classmethod
+    def to_naive_utc(cls, value: Optional[datetime]) -> Optional[datetime]:
+        return naive_utc(value)
+
+    @model_validator(mode="after")
+    def check_range(self):
+        if self.created_from and self.created_to and self.created_from >= self.created_to:
+            raise ValueError("created_from must be before created_to")
+        return self
@@ -6,6 +6,7 @@ from schema.transaction import TransactionReadSimple
 from uuid import UUID, uuid4
 from typing import List
 from pydantic import EmailStr
+from apps.models.enums import Role, Statut
 
 
 
@@ -21,8 +22,8 @@ class UserReadSimple(SQLModel):
     email: Optional[EmailStr] = None
     created_at: datetime
     numero: Optional[str] = None
-    statut: str
-    role :  str 
+    statut: Statut
+    role :  Role 
 
 class UserReadDetail(UserReadSimple):
     vouchers: List[VoucherReadSimple] = [] 
@@ -2,16 +2,17 @@ from typing import Optional
 from datetime import datetime
 from sqlmodel import SQLModel, Field, Relationship
 from uuid import UUID
+from apps.models.enums import Statut
 
 
 class VoucherReadSimple(SQLModel):
     id: UUID
     username_voucher: str
     password_voucher: str
-    created_at: datetime
     package_id: Optional[UUID]
-    gernerated_at: datetime
-    user_id: Optional[int]
+    generated_at: datetime
+    user_id: Optional[UUID]
+    statut: Statut
         
 
 
@@ -20,6 +21,7 @@ class VoucherCreate(SQLModel):
     package_id: Optional[UUID] 
     username_voucher: str
     password_voucher: str
+    transaction_id: Optional[UUID] = None
 
 
 class VoucherReadDetail(SQLModel):
@@ -1,17 +1,28 @@
-from jose import JWTError, jwt  # pyright: ignore[reportMissingModuleSource]
 from fastapi import Depends,  HTTPException, Security
 from passlib.context import CryptContext # pyright: ignore[reportMissingModuleSource]
 from datetime import datetime, timedelta, timezone
-from database import get_session
 from sqlmodel import select
 from apps.models.models import User as UserModel
+from apps.models.enums import Statut
 from crud.user import get_user_by_username
 from config import config
 from typing import Annotated
-from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from services.auth_service.hashing_pool import PasswordHashingPool
+from services.auth_service.token_version import TokenVersionCache
+from services.auth_service.token_codec import encode_token
+from services.cache_service.invalidation import invalidation_bus
+from uuid import UUID
 
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+hashing_pool = PasswordHashingPool(max_workers=config.password_hash_workers)
+token_versions = TokenVersionCache(
+    ttl_seconds=config.token_version_cache_ttl_seconds,
+    max_entries=config.token_version_cache_size,
+)
+# Révocation faite par un autre worker : on oublie la version en cache
+invalidation_bus.register("user", lambda user_id: token_versions.invalidate(UUID(user_id) if user_id else None))
 
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
@@ -21,9 +32,17 @@ def get_password_hash(password):
     return pwd_context.hash(password)
 
 
-def authenticate_user(username: str, password: str, session: Session):
-    user = get_user_by_username(session, username)
-    if not user or not verify_password(password, user.hashed_password) and user.statut != "delete":
+async def verify_password_async(plain_password, hashed_password):
+    return await hashing_pool.run(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password):
+    return await hashing_pool.run(get_password_hash, password)
+
+
+async def authenticate_user(username: str, password: str, session: AsyncSession):
+    user = await get_user_by_username(session, username)
+    if not user or not await verify_password_async(password, user.hashed_password) and user.statut != Statut.DELETED:
         raise HTTPException(
             status_code=401,
             detail="Incorrect username or password",
@@ -32,6 +51,28 @@ def authenticate_user(username: str, password: str, session: Session):
     return user
 
 
+def build_access_token_data(user: UserModel) -> dict:
+    # Claims suffisants pour authentifier sans relire la ligne User (mode sans état)
+    return {
+        "sub": user.username,
+        "scopes": [user.role],
+        "uid": str(user.id),
+        "role": user.role,
+        "statut": user.statut,
+        "ver": user.token_version,
+    }
+
+
+async def revoke_user_tokens(session: AsyncSession, user: UserModel) -> None:
+    # Invalide tous les jetons déjà émis pour cet utilisateur
+    user.token_version = (user.token_version or 0) + 1
+    session.add(user)
+    await invalidation_bus.publish(session, "user", user.id)
+    await session.commit()
+    await session.refresh(user)
+    token_versions.set(user.id, user.token_version)
+
+
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
     to_encode = data.copy()
     if expires_delta:
@@ -39,7 +80,7 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
     else:
         expire = datetime.now(timezone.utc) + timedelta(minutes=15)
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, config.SECRET_KEY, algorithm=config.ALGORITHM)
+    encoded_jwt = encode_token(to_encode)
     return encoded_jwt
 
 def create_refresh_token(data: dict, expires_delta: timedelta | None = None):
@@ -49,5 +90,5 @@ def create_refresh_token(data: dict, expires_delta: timedelta | None = None):
     else:
         expire = datetime.now(timezone.utc) + timedelta(days=7)
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, config.SECRET_KEY, algorithm=config.ALGORITHM)
+    encoded_jwt = encode_token(to_encode)
     return encoded_jwt
\ No newline at end of file
@@ -0,0 +1,101 @@
+import hmac
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import jwt  # type: ignore
+from jwt import InvalidTokenError  # pyright: ignore[reportMissingImports]
+from pydantic import ValidationError
+from schema.auth import TokenData
+from config import config
+
+# Seul point d'entrée JWT de l'application (PyJWT) : encodage, décodage et cache.
+__all__ = ["InvalidTokenError", "encode_token", "decode_token", "decode_token_data", "verified_tokens"]
+
+
+class VerifiedTokenCache:
+    """Cache LRU des jetons déjà vérifiés, indexé par la signature.
+
+    La partie signée (en-tête.payload) est conservée et comparée à chaque hit :
+    une signature valide recollée sur un autre payload ne sort jamais du cache.
+    Chaque entrée expire au `exp` du jeton.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[str, TokenData, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token: str) -> Optional[TokenData]:
+        signing_input, _, signature = token.rpartition(".")
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(signature)
+            if entry is not None:
+                if entry[2] <= now:
+                    del self._entries[signature]
+                elif hmac.compare_digest(entry[0], signing_input):
+                    self._entries.move_to_end(signature)
+                    self.hits += 1
+                    return entry[1]
+            self.misses += 1
+        return None
+
+    def put(self, token: str, token_data: TokenData, exp: float) -> None:
+        signing_input, _, signature = token.rpartition(".")
+        with self._lock:
+            self._entries[signature] = (signing_input, token_data, exp)
+            self._entries.move_to_end(signature)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+verified_tokens = VerifiedTokenCache(max_entries=config.token_cache_size)
+
+
+def encode_token(claims: dict) -> str:
+    return jwt.encode(claims, config.SECRET_KEY, algorithm=config.ALGORITHM)
+
+
+def decode_token(token: str) -> dict:
+    return jwt.decode(token, config.SECRET_KEY, algorithms=[config.ALGORITHM])
+
+
+def decode_token_data(token: str) -> TokenData:
+    """Vérifie le jeton et renvoie ses claims ; lève InvalidTokenError sinon."""
+    cached = verified_tokens.get(token)
+    if cached is not None:
+        return cached
+    payload = decode_token(token)
+    try:
+        token_data = TokenData(
+            username=payload.get("sub"),
+            scopes=payload.get("scopes", []),
+            user_id=payload.get("uid"),
+            role=payload.get("role"),
+            statut=payload.get("statut"),
+            token_version=payload.get("ver"),
+        )
+    except ValidationError as e:
+        raise InvalidTokenError(str(e))
+    exp = payload.get("exp")
+    if exp is not None:
+        verified_tokens.put(token, token_data, float(exp))
+    return token_data
@@ -0,0 +1,58 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+from uuid import UUID
+
+
+class TokenVersionCache:
+    """Cache borné (LRU + TTL) de User.token_version.
+
+    En mode sans état, c'est la seule lecture nécessaire pour savoir si un jeton
+    a été révoqué. Une révocation faite sur un autre worker est vue au plus tard
+    après `ttl_seconds`.
+    """
+
+    def __init__(self, ttl_seconds: int, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: OrderedDict[UUID, tuple[Optional[int], float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, user_id: UUID, loader: Callable[[UUID], Awaitable[Optional[int]]]) -> Optional[int]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        version = await loader(user_id)
+        self.set(user_id, version)
+        return version
+
+    def set(self, user_id: UUID, version: Optional[int]) -> None:
+        with self._lock:
+            self._entries[user_id] = (version, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: UUID | None = None) -> None:
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "ttl_seconds": self.ttl_seconds,
+            }
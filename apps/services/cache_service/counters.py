@@ -0,0 +1,142 @@
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from apps.models.models import Transaction, User, Voucher
+from apps.models.enums import Statut
+from config import config
+
+_PENDING = "pending_count_changes"
+_UNKNOWN = object()
+_DELETED = Statut.DELETED.value
+
+# Tableau de bord : (modèle, colonne de répartition) par entité. `total` ne compte que les
+# lignes non supprimées, comme les listes ; réparties par statut, les supprimées restent
+# visibles dans by_status["deleted"], sinon (payment_status) elles sont exclues
+TRACKED = {
+    "users": (User, "statut"),
+    "vouchers": (Voucher, "statut"),
+    "transactions": (Transaction, "payment_status"),
+}
+_BY_MODEL = {model: (name, column) for name, (model, column) in TRACKED.items()}
+
+
+@dataclass
+class CountEntry:
+    total: int  # lignes non supprimées
+    by_status: Counter
+    source: str  # "exact" ou "estimate"
+    as_of: Optional[datetime]  # instant du comptage, ou du dernier ANALYZE pour une estimation
+    loaded_at: float = field(default_factory=time.monotonic)
+    adjusted_writes: int = 0  # écritures de ce worker appliquées depuis le comptage
+
+    def snapshot(self) -> dict:
+        return {
+            "total": self.total,
+            "by_status": dict(self.by_status),
+            "staleness": {
+                "source": self.source,
+                "as_of": self.as_of.isoformat() if self.as_of else None,
+                "cached_for_seconds": round(time.monotonic() - self.loaded_at, 1),
+                "adjusted_writes": self.adjusted_writes,
+            },
+        }
+
+
+class CountCache:
+    """Totaux par entité, recalculés après `ttl_seconds` et ajustés entre-temps par les écritures.
+
+    Les écritures des autres workers ne sont vues qu'au recalcul : l'indicateur
+    de fraîcheur l'indique (source, as_of, âge du cache). Les UPDATE en masse hors
+    ORM (rapprochement, inbox) ne passent pas par after_flush : ils appellent
+    invalidate() et forcent un recomptage, d'où un as_of récent et
+    adjusted_writes à 0.
+    """
+
+    def __init__(self, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self._entries: dict[str, CountEntry] = {}
+
+    def get(self, name: str) -> Optional[CountEntry]:
+        entry = self._entries.get(name)
+        if entry is not None and time.monotonic() - entry.loaded_at < self.ttl_seconds:
+            return entry
+        return None
+
+    def set(self, name: str, entry: CountEntry) -> None:
+        self._entries[name] = entry
+
+    def invalidate(self, name: str) -> None:
+        # Écritures en masse hors ORM (pas de delta connu) : recomptage à la prochaine lecture
+        self._entries.pop(name, None)
+
+    def apply(self, name: str, old: Optional[str], new: Optional[str]) -> None:
+        entry = self._entries.get(name)
+        if entry is None:
+            return
+        if old is _UNKNOWN:
+            del self._entries[name]  # recomptage à la prochaine lecture
+            return
+        if old is not None:
+            entry.by_status[old] -= 1
+        if new is not None:
+            entry.by_status[new] += 1
+        entry.total += _is_live(new) - _is_live(old)
+        entry.adjusted_writes += 1
+
+
+count_cache = CountCache(ttl_seconds=config.counts_cache_ttl_seconds)
+
+
+def _is_live(status: Optional[str]) -> bool:
+    return status is not None and status != _DELETED
+
+
+def _status(obj, column: str) -> Optional[str]:
+    # Valeur comptée pour obj ; None si la ligne n'entre pas dans les totaux
+    if column != "statut" and str(obj.statut) == _DELETED:
+        return None
+    value = getattr(obj, column)
+    return str(value) if value is not None else None
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changes(session: Session, flush_context) -> None:
+    # Appelé avant la remise à zéro de l'historique : les anciennes valeurs sont encore visibles
+    changes = session.info.setdefault(_PENDING, [])
+    for obj in session.new:
+        if type(obj) in _BY_MODEL:
+            name, column = _BY_MODEL[type(obj)]
+            changes.append((name, None, _status(obj, column)))
+    for obj in session.dirty:
+        if type(obj) in _BY_MODEL:
+            name, column = _BY_MODEL[type(obj)]
+            if column != "statut" and inspect(obj).attrs.statut.history.has_changes():
+                # Suppression logique (ou restauration) : la ligne entre ou sort des totaux
+                changes.append((name, _UNKNOWN, None))
+                continue
+            history = inspect(obj).attrs[column].history
+            if history.added and history.deleted:
+                if history.deleted[0] != history.added[0]:
+                    changes.append((name, str(history.deleted[0]), str(history.added[0])))
+            elif history.added:
+                # Ancienne valeur non chargée (attribut expiré) : delta inconnu
+                changes.append((name, _UNKNOWN, None))
+    for obj in session.deleted:
+        if type(obj) in _BY_MODEL:
+            name, column = _BY_MODEL[type(obj)]
+            changes.append((name, _status(obj, column), None))
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_changes(session: Session) -> None:
+    for name, old, new in session.info.pop(_PENDING, ()):
+        count_cache.apply(name, old, new)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_changes(session: Session) -> None:
+    session.info.pop(_PENDING, None)
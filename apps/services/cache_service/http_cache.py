@@ -0,0 +1,36 @@
+import hashlib
+from typing import Optional
+from fastapi import Request, Response
+from config import config
+
+
+def make_etag(*parts) -> str:
+    # ETag fort : empreinte de la représentation (version du catalogue, valeurs des colonnes...)
+    return '"' + hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match utilise la comparaison faible (RFC 9110 §13.1.2) : on ignore "W/"
+    candidates = (candidate.strip().removeprefix("W/") for candidate in header.split(","))
+    return etag in candidates
+
+
+def cache_headers(route: str, etag: str, vary: Optional[str] = None) -> dict[str, str]:
+    headers = {"ETag": etag, "Cache-Control": config.cache_control.get(route, "no-cache")}
+    if vary:
+        headers["Vary"] = vary
+    return headers
+
+
+def conditional(request: Request, response: Response, route: str, etag: str, vary: Optional[str] = None):
+    """En-têtes de cache sur la réponse ; renvoie une 304 (sans corps) si le client est à jour."""
+    headers = cache_headers(route, etag, vary)
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
@@ -0,0 +1,151 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import uuid
+from collections import defaultdict
+from typing import Callable, Optional
+import asyncpg
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from config import config
+
+logger = logging.getLogger("cache")
+
+CHANNEL = "cache_invalidation"
+_PENDING = "pending_invalidations"
+
+
+class InvalidationBus:
+    """Invalidation des caches en mémoire entre workers via LISTEN/NOTIFY.
+
+    publish() émet pg_notify dans la transaction de l'écriture : le message
+    n'est diffusé qu'au commit, et jamais en cas de rollback. Le worker
+    émetteur applique l'invalidation localement dès le commit ; les autres la
+    reçoivent par leur écouteur. Après une (re)connexion de l'écouteur, les
+    messages manqués sont perdus : tous les caches sont vidés.
+    """
+
+    def __init__(self, dsn: Optional[str], heartbeat_seconds: float):
+        self.dsn = dsn
+        self.heartbeat_seconds = heartbeat_seconds
+        self.origin = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._handlers: dict[str, list[Callable[[Optional[str]], None]]] = defaultdict(list)
+        self._task: Optional[asyncio.Task] = None
+        self.connected = False
+        self.published = 0
+        self.received = 0
+        self.reconnects = 0
+        self.full_flushes = 0
+        self.last_error: Optional[str] = None
+
+    def register(self, entity: str, handler: Callable[[Optional[str]], None]) -> None:
+        # handler(entity_id) ; entity_id=None signifie "tout vider"
+        self._handlers[entity].append(handler)
+
+    async def publish(self, session: AsyncSession, entity: str, entity_id=None) -> None:
+        payload = json.dumps({"entity": entity, "id": str(entity_id) if entity_id else None, "origin": self.origin})
+        connection = await session.connection()
+        await connection.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": CHANNEL, "payload": payload})
+        session.sync_session.info.setdefault(_PENDING, []).append((entity, entity_id))
+        self.published += 1
+
+    def dispatch(self, entity: str, entity_id=None) -> None:
+        for handler in self._handlers.get(entity, ()):
+            try:
+                handler(str(entity_id) if entity_id else None)
+            except Exception:
+                logger.exception("cache invalidation handler failed for %s", entity)
+
+    def flush_all(self) -> None:
+        self.full_flushes += 1
+        for entity in list(self._handlers):
+            self.dispatch(entity, None)
+
+    def _on_notify(self, connection, pid, channel, payload) -> None:
+        self.received += 1
+        try:
+            message = json.loads(payload)
+            entity, entity_id, origin = message["entity"], message.get("id"), message.get("origin")
+        except (ValueError, KeyError, TypeError):
+            logger.warning("invalid cache invalidation payload, flushing all caches")
+            self.flush_all()
+            return
+        if origin != self.origin:  # déjà appliqué localement au commit
+            self.dispatch(entity, entity_id)
+
+    async def _listen(self) -> None:
+        delay = 1.0
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(self.dsn)
+                await connection.add_listener(CHANNEL, self._on_notify)
+                self.connected = True
+                # Notifications perdues pendant la coupure (ou avant le démarrage)
+                self.flush_all()
+                delay = 1.0
+                while True:
+                    await asyncio.sleep(self.heartbeat_seconds)
+                    await connection.execute("SELECT 1")
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                self.last_error = repr(exc)
+                self.reconnects += 1
+                logger.warning("cache invalidation listener disconnected: %r", exc)
+            finally:
+                self.connected = False
+                if connection is not None and not connection.is_closed():
+                    await connection.close()
+            await asyncio.sleep(delay + random.uniform(0, delay))
+            delay = min(delay * 2, 30.0)
+
+    def start(self) -> None:
+        if self.dsn and self._task is None:
+            self._task = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "origin": self.origin,
+            "listening": self.connected,
+            "published": self.published,
+            "received": self.received,
+            "reconnects": self.reconnects,
+            "full_flushes": self.full_flushes,
+            "last_error": self.last_error,
+        }
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending(session: Session) -> None:
+    for entity, entity_id in session.info.pop(_PENDING, ()):
+        invalidation_bus.dispatch(entity, entity_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_pending(session: Session) -> None:
+    session.info.pop(_PENDING, None)
+
+
+def _listener_dsn() -> Optional[str]:
+    # asyncpg attend une URL postgresql:// sans suffixe de driver
+    if not config.cache_bus_enabled:
+        return None
+    return make_url(config.database_url).set(drivername="postgresql").render_as_string(hide_password=False)
+
+
+invalidation_bus = InvalidationBus(dsn=_listener_dsn(), heartbeat_seconds=config.cache_bus_heartbeat_seconds)
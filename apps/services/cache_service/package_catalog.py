@@ -0,0 +1,99 @@
+import asyncio
+import hashlib
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Optional, Sequence
+from uuid import UUID
+from config import config
+from services.cache_service.invalidation import invalidation_bus
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    version: int
+    loaded_at: float
+    packages: tuple  # triés par nom
+    digest: str  # empreinte du contenu : identique sur tous les workers
+    by_id: dict[UUID, Any] = field(repr=False)
+    by_name: dict[str, Any] = field(repr=False)
+    by_profile: dict[str, Any] = field(repr=False)
+
+    @classmethod
+    def build(cls, version: int, packages: Sequence) -> "CatalogSnapshot":
+        ordered = tuple(sorted(packages, key=lambda package: package.name))
+        return cls(
+            version=version,
+            loaded_at=time.monotonic(),
+            packages=ordered,
+            digest=hashlib.blake2b(repr(ordered).encode(), digest_size=16).hexdigest(),
+            by_id={package.id: package for package in ordered},
+            by_name={package.name: package for package in ordered},
+            by_profile={package.mikrotik_profile_name: package for package in ordered if package.mikrotik_profile_name},
+        )
+
+
+class PackageCatalog:
+    """Catalogue en mémoire des packages actifs, rechargé en bloc.
+
+    Les routes d'écriture appellent invalidate() ; `ttl_seconds` borne la durée
+    de vie d'un instantané si une invalidation est manquée. Un seul
+    rechargement à la fois : les requêtes concurrentes attendent son résultat.
+    """
+
+    def __init__(self, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._version = 0
+        self._lock = asyncio.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.invalidations = 0
+
+    def _fresh(self) -> Optional[CatalogSnapshot]:
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == self._version \
+                and time.monotonic() - snapshot.loaded_at < self.ttl_seconds:
+            return snapshot
+        return None
+
+    async def get(self, loader: Callable[[], Awaitable[Sequence]]) -> CatalogSnapshot:
+        snapshot = self._fresh()
+        if snapshot is not None:
+            self.hits += 1
+            return snapshot
+        self.misses += 1
+        async with self._lock:
+            snapshot = self._fresh()
+            if snapshot is not None:
+                return snapshot
+            version = self._version
+            snapshot = CatalogSnapshot.build(version, await loader())
+            self.loads += 1
+            # Invalidé pendant le chargement : on sert ce résultat sans le garder
+            if version == self._version:
+                self._snapshot = snapshot
+            return snapshot
+
+    def invalidate(self) -> None:
+        self._version += 1
+        self._snapshot = None
+        self.invalidations += 1
+
+    def stats(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            "version": self._version,
+            "packages": len(snapshot.packages) if snapshot else 0,
+            "age_seconds": round(time.monotonic() - snapshot.loaded_at, 1) if snapshot else None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "loads": self.loads,
+            "invalidations": self.invalidations,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+
+package_catalog = PackageCatalog(ttl_seconds=config.package_catalog_ttl_seconds)
+# Rechargement complet quel que soit le package modifié
+invalidation_bus.register("package", lambda package_id: package_catalog.invalidate())
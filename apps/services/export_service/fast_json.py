@@ -0,0 +1,38 @@
+import json
+from datetime import datetime
+from typing import Any, Sequence
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # dépendance optionnelle : repli sur json (plus lent, même sortie)
+    orjson = None
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)  # UUID
+
+
+def dumps(content: Any) -> bytes:
+    # UUID, datetime et enums (str) sont gérés nativement par orjson
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, default=_json_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def rows_to_dicts(fields: Sequence[str], rows: Sequence) -> list[dict]:
+    # Lignes issues d'un select() de colonnes : pas d'objet ORM ni de validation Pydantic
+    return [dict(zip(fields, row)) for row in rows]
+
+
+class FastJSONResponse(JSONResponse):
+    """Réponse JSON sérialisée par orjson si installé.
+
+    À renvoyer avec un contenu déjà conforme au schéma : FastAPI ne revalide
+    pas une Response renvoyée directement par la route.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
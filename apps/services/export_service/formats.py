@@ -0,0 +1,22 @@
+import csv
+import io
+from datetime import datetime
+from typing import Sequence
+from services.export_service.fast_json import dumps
+
+
+def ndjson_chunk(columns: Sequence[str], rows: Sequence) -> bytes:
+    # Une ligne JSON par enregistrement, un bloc par lot de lignes
+    return b"".join(dumps(dict(zip(columns, row))) + b"\n" for row in rows)
+
+
+def csv_chunk(rows: Sequence) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(value.isoformat() if isinstance(value, datetime) else value for value in row)
+    return buffer.getvalue().encode()
+
+
+def csv_header(columns: Sequence[str]) -> bytes:
+    return csv_chunk([columns])
@@ -0,0 +1,63 @@
+import logging
+import warnings
+from services.observability_service.sql_tracing import RequestQueryStats, request_query_stats
+
+logger = logging.getLogger("sql")
+
+
+class NPlusOneError(RuntimeError):
+    pass
+
+
+class NPlusOneWarning(UserWarning):
+    pass
+
+
+class QueryCounterMiddleware:
+    """Middleware ASGI : compte les requêtes SQL et le temps base de données par requête HTTP.
+
+    - expose_headers (dev) : ajoute X-DB-Query-Count et X-DB-Time-Ms à la réponse ;
+    - detect_n_plus_one (test) : signale une même forme de requête répétée plus de
+      `threshold` fois, par warning ou par exception selon `action`.
+    """
+
+    def __init__(self, app, *, expose_headers: bool, detect_n_plus_one: bool, threshold: int, action: str = "warn"):
+        self.app = app
+        self.expose_headers = expose_headers
+        self.detect_n_plus_one = detect_n_plus_one
+        self.threshold = threshold
+        self.action = action
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = RequestQueryStats()
+        token = request_query_stats.set(stats)
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                if self.detect_n_plus_one:
+                    self._check(scope, stats)
+                if self.expose_headers:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"x-db-query-count", str(stats.count).encode()))
+                    headers.append((b"x-db-time-ms", f"{stats.db_time_ms:.2f}".encode()))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            request_query_stats.reset(token)
+
+    def _check(self, scope, stats: RequestQueryStats) -> None:
+        repeated = {shape: count for shape, count in stats.shapes.items() if count > self.threshold}
+        if not repeated:
+            return
+        shape, count = max(repeated.items(), key=lambda item: item[1])
+        message = f'N+1 probable sur {scope["method"]} {scope["path"]} : {count} x {shape}'
+        if self.action == "raise":
+            raise NPlusOneError(message)
+        logger.warning(message)
+        warnings.warn(message, NPlusOneWarning, stacklevel=2)
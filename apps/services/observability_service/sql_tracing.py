@@ -0,0 +1,173 @@
+import logging
+import random
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger("sql")
+
+# Route à l'origine des requêtes SQL, posée par RouteContextMiddleware
+current_route: ContextVar[Optional[str]] = ContextVar("current_route", default=None)
+
+
+class RequestQueryStats:
+    # Requêtes SQL d'une requête HTTP (voir QueryCounterMiddleware)
+    def __init__(self):
+        self.count = 0
+        self.db_time_ms = 0.0
+        self.shapes: Counter[str] = Counter()
+
+    def record(self, shape: str, duration_ms: float) -> None:
+        self.count += 1
+        self.db_time_ms += duration_ms
+        self.shapes[shape] += 1
+
+
+request_query_stats: ContextVar[Optional[RequestQueryStats]] = ContextVar("request_query_stats", default=None)
+
+_WHITESPACE = re.compile(r"\s+")
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PARAM_LISTS = re.compile(r"\((?:\s*(?:\?|%\(\w+\)s|\$\?|__\[POSTCOMPILE_\w+\])\s*,?)+\)")
+
+
+@lru_cache(maxsize=2048)
+def normalize_sql(statement: str) -> str:
+    # Forme de la requête : littéraux et listes de paramètres remplacés par "?"
+    sql = _WHITESPACE.sub(" ", statement).strip()
+    sql = _LITERALS.sub("?", sql)
+    return _PARAM_LISTS.sub("(?)", sql)
+
+
+def redact_parameters(parameters) -> str:
+    # Jamais de valeurs dans les logs (mots de passe, e-mails, références de paiement)
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{key}=<{type(value).__name__}>" for key, value in parameters.items()) + "}"
+    if isinstance(parameters, (list, tuple)):
+        return f"<{len(parameters)} params>"
+    return "<none>"
+
+
+class LatencyHistogram:
+    BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+    def __init__(self, max_shapes: int, key: str = "sql"):
+        self.max_shapes = max_shapes
+        self.key = key
+        self._lock = threading.Lock()
+        self._shapes: dict[str, list[int]] = {}
+        self._totals: dict[str, float] = {}
+
+    def observe(self, shape: str, duration_ms: float) -> None:
+        with self._lock:
+            if shape not in self._shapes and len(self._shapes) >= self.max_shapes:
+                shape = "<other>"
+            counts = self._shapes.setdefault(shape, [0] * (len(self.BUCKETS_MS) + 1))
+            counts[bisect_left(self.BUCKETS_MS, duration_ms)] += 1
+            self._totals[shape] = self._totals.get(shape, 0.0) + duration_ms
+
+    def _quantile(self, counts: list[int], q: float) -> Optional[float]:
+        target = q * sum(counts)
+        seen = 0
+        for index, count in enumerate(counts):
+            seen += count
+            if seen >= target:
+                # None : au-delà du dernier seuil
+                return float(self.BUCKETS_MS[index]) if index < len(self.BUCKETS_MS) else None
+        return 0.0
+
+    def snapshot(self) -> list[dict]:
+        with self._lock:
+            rows = []
+            for shape, counts in self._shapes.items():
+                total = sum(counts)
+                rows.append({
+                    self.key: shape,
+                    "count": total,
+                    "avg_ms": round(self._totals[shape] / total, 3),
+                    "p50_le_ms": self._quantile(counts, 0.5),
+                    "p95_le_ms": self._quantile(counts, 0.95),
+                    "buckets": dict(zip([*map(str, self.BUCKETS_MS), "+inf"], counts)),
+                })
+            return sorted(rows, key=lambda row: row["avg_ms"] * row["count"], reverse=True)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._shapes.clear()
+            self._totals.clear()
+
+
+class SQLTracer:
+    """Journal des requêtes lentes et échantillonnage des latences via les événements curseur."""
+
+    def __init__(self, slow_query_ms: float, sample_rate: float, max_shapes: int):
+        self.slow_query_ms = slow_query_ms
+        self.sample_rate = sample_rate
+        self.histogram = LatencyHistogram(max_shapes=max_shapes)
+        self.slow_queries = 0
+
+    def install(self, engine: Engine) -> None:
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+        event.listen(engine, "handle_error", self._handle_error)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    def _handle_error(self, exception_context):
+        starts = exception_context.connection.info.get("query_start") if exception_context.connection else None
+        if starts:
+            starts.pop()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        duration_ms = (time.perf_counter() - conn.info["query_start"].pop()) * 1000
+        request_stats = request_query_stats.get()
+        if request_stats is not None:
+            request_stats.record(normalize_sql(statement), duration_ms)
+        sampled = self.sample_rate > 0 and random.random() < self.sample_rate
+        slow = duration_ms >= self.slow_query_ms
+        if not (sampled or slow):
+            return
+        shape = normalize_sql(statement)
+        if sampled:
+            self.histogram.observe(shape, duration_ms)
+        if slow:
+            self.slow_queries += 1
+            logger.warning(
+                "slow query %.1f ms rows=%s route=%s sql=%s params=%s",
+                duration_ms,
+                cursor.rowcount,
+                current_route.get() or "-",
+                shape,
+                redact_parameters(parameters),
+            )
+
+    def stats(self) -> dict:
+        return {
+            "slow_query_ms": self.slow_query_ms,
+            "sample_rate": self.sample_rate,
+            "slow_queries": self.slow_queries,
+            "statements": self.histogram.snapshot(),
+        }
+
+
+class RouteContextMiddleware:
+    """Middleware ASGI : associe la route HTTP courante aux requêtes SQL qu'elle déclenche."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        token = current_route.set(f'{scope["method"]} {scope["path"]}')
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_route.reset(token)
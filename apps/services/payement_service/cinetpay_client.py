@@ -0,0 +1,112 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Optional
+import httpx
+from config import config
+from services.observability_service.sql_tracing import LatencyHistogram
+
+logger = logging.getLogger("cinetpay")
+
+
+class CinetPayError(Exception):
+    pass
+
+
+class CinetPayClient:
+    """Client HTTP asynchrone de l'API CinetPay v2.
+
+    Connexions keep-alive réutilisées (pool httpx, au plus `max_connections`
+    par worker), un délai global par appel qui couvre reprises et backoff, et
+    des reprises bornées avec backoff exponentiel à jitter complet.
+    L'initialisation n'est reprise que si la requête n'a pas pu partir
+    (connexion impossible) : un doublon de paiement est pire qu'une erreur.
+    """
+
+    def __init__(self, apikey: str, site_id: str, base_url: str, timeout: float, connect_timeout: float,
+                 max_retries: int, backoff_seconds: float, max_connections: int):
+        self.apikey = apikey
+        self.site_id = site_id
+        self.base_url = base_url
+        self.timeout_seconds = timeout
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.latency = LatencyHistogram(max_shapes=10, key="operation")
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout, limits=self.limits)
+        return self._client
+
+    async def _post(self, operation: str, path: str, payload: dict, idempotent: bool) -> Any:
+        # httpx.Timeout ne borne que chaque étape (connexion, lecture, écriture) d'une tentative
+        try:
+            async with asyncio.timeout(self.timeout_seconds):
+                return await self._post_with_retries(operation, path, payload, idempotent)
+        except TimeoutError as exc:
+            self.failures += 1
+            raise CinetPayError(f"{operation} timed out after {self.timeout_seconds}s") from exc
+
+    async def _post_with_retries(self, operation: str, path: str, payload: dict, idempotent: bool) -> Any:
+        retryable = (httpx.TransportError,) if idempotent else (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+        for attempt in range(self.max_retries + 1):
+            self.calls += 1
+            start = time.perf_counter()
+            try:
+                response = await self.client.post(path, json=payload)
+                if idempotent and (response.status_code >= 500 or response.status_code == 429):
+                    raise httpx.HTTPStatusError("gateway unavailable", request=response.request, response=response)
+                return response.json()
+            except (*retryable, httpx.HTTPStatusError) as exc:
+                if attempt == self.max_retries:
+                    self.failures += 1
+                    raise CinetPayError(f"{operation} failed after {attempt + 1} attempts: {exc!r}") from exc
+                self.retries += 1
+                logger.warning("cinetpay %s attempt %d failed: %r", operation, attempt + 1, exc)
+            except (httpx.HTTPError, ValueError) as exc:
+                self.failures += 1
+                raise CinetPayError(f"{operation} failed: {exc!r}") from exc
+            finally:
+                self.latency.observe(operation, (time.perf_counter() - start) * 1000)
+            await asyncio.sleep(random.uniform(0, self.backoff_seconds * 2 ** attempt))
+
+    async def initialize_payment(self, data: dict) -> Any:
+        payload = {**data, "apikey": self.apikey, "site_id": self.site_id}
+        return await self._post("payment_init", "/v2/payment", payload, idempotent=False)
+
+    async def check_transaction(self, transaction_id: str) -> Any:
+        payload = {"apikey": self.apikey, "site_id": self.site_id, "transaction_id": transaction_id}
+        return await self._post("payment_check", "/v2/payment/check", payload, idempotent=True)
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "retries": self.retries,
+            "failures": self.failures,
+            "latency": self.latency.snapshot(),
+        }
+
+
+cinetpay_client = CinetPayClient(
+    apikey=config.apikey,
+    site_id=config.side_id,
+    base_url=config.cinetpay_base_url,
+    timeout=config.cinetpay_timeout_seconds,
+    connect_timeout=config.cinetpay_connect_timeout_seconds,
+    max_retries=config.cinetpay_max_retries,
+    backoff_seconds=config.cinetpay_backoff_seconds,
+    max_connections=config.cinetpay_max_connections,
+)
@@ -1,45 +1,38 @@
-from cinetpay_sdk.s_d_k import Cinetpay
-from crud.transaction import update_transaction_status, get_transaction_by_txid
-from config import config
-from sqlmodel import Session      
-from cinetpay_sdk.s_d_k import Cinetpay
-from crud.transaction import update_transaction_status, get_transaction_by_txid
-from config import config
-from typing import Any
+import logging
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import Any, Optional
+from services.payement_service.cinetpay_client import CinetPayError, cinetpay_client
+from services.payement_service.verification_cache import verifications
 
-client = Cinetpay(apikey=config.apikey, site_id=config.side_id)
+logger = logging.getLogger("cinetpay")
 
+# Champs attendus par /v2/payment (le SDK envoyait des clés erronées, ex. "return_url:")
+INIT_FIELDS = ("amount", "transaction_id", "currency", "description", "return_url", "notify_url",
+               "customer_name", "customer_surname")
 
-def initialize_payment(data: dict) -> Any:
+
+async def initialize_payment(data: dict) -> Any:
+    missing = [field for field in INIT_FIELDS if data.get(field) in (None, "")]
+    if missing:
+        return {"status": "error", "message": f"missing fields: {', '.join(missing)}"}
     try:
-        response = client.PaymentInitialization(data)
-        return response
-    except Exception as e:
-        # log si besoin
+        return await cinetpay_client.initialize_payment({field: data[field] for field in INIT_FIELDS})
+    except CinetPayError as e:
+        logger.error("%s", e)
         return {"status": "error", "message": str(e)}
 
-def verify_transaction(transaction_id: str, session: Session) -> bool:
-    
+
+async def _check_transaction(transaction_id: str) -> Optional[dict]:
     try:
-        response = client.TransactionVerfication_trx(transaction_id)
-
-        if not response:
-            return False
-
-        tx = get_transaction_by_txid(session, transaction_id)
-        if not tx:
-            return False                 
-
-    except Exception as e:
-        # log si besoin
-        return False
-    if response.get('code') == '00' and tx.payment_gateway_ref !=None:
-        update_transaction_status(
-        session=session,
-        transaction_id=tx.payment_gateway_ref 
-        ,  # utiliser le txid externe
-        new_status='SUCCESS',
-        method=None  # ou passer la méthode si dispo
-    )
-    return True
-   
\ No newline at end of file
+        response = await cinetpay_client.check_transaction(transaction_id)
+    except CinetPayError as e:
+        logger.error("%s", e)
+        return None
+    return response if isinstance(response, dict) else None
+
+
+async def verify_transaction(transaction_id: str, session: Optional[AsyncSession] = None) -> Optional[dict]:
+    # Réponse brute de /v2/payment/check (None si CinetPay est injoignable) ;
+    # la mise à jour locale est faite par l'appelant à partir de response["data"].
+    # Un seul appel sortant par transaction à la fois ; ACCEPTED / REFUSED servis depuis le cache.
+    return await verifications.get(transaction_id, _check_transaction)
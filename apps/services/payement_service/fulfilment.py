@@ -0,0 +1,171 @@
+import logging
+from collections import namedtuple
+from typing import Optional
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.exc import IntegrityError
+from sqlmodel.ext.asyncio.session import AsyncSession
+from apps.models.models import Transaction, Voucher
+from apps.models.enums import PaymentStatus
+from config import config
+from crud.package import get_package_for_delivery
+from crud.transaction import (get_transaction_by_txid, lock_transaction_by_txid, settle_pending_transaction,
+                              get_email_by_transaction_id)
+from crud.voucher import get_voucher_code_for_transaction
+from schema.voucher import VoucherCreate
+from services.cache_service.counters import count_cache
+from services.payement_service.cinetpay_service import verify_transaction
+from services.payement_service.notification_service import send_payment_confirmation_email
+from services.service_mikrotik.mikrotik import MikroTikProfileCreator, generate_nhr_code
+
+logger = logging.getLogger("payments")
+
+
+class RetryLater(Exception):
+    # Échec transitoire : la notification sera retraitée après un délai
+    pass
+
+
+class VoucherBusy(RetryLater):
+    # Un autre worker détient le verrou de la transaction et émet déjà le voucher
+    pass
+
+
+class MissingDeliveryProfile(Exception):
+    # Package supprimé ou sans profil MikroTik : aucune reprise n'y changera rien
+    pass
+
+
+IssuedVoucher = namedtuple("IssuedVoucher", "code created")
+
+VOUCHER_CODE_ATTEMPTS = 3
+
+
+async def create_hotspot_user(profile_name: str) -> str:
+    mikrotik_service = await run_in_threadpool(
+        MikroTikProfileCreator,
+        host=config.mikrotik_host,
+        username=config.mikrotik_user,
+        password=config.mikrotik_password
+    )
+    return await run_in_threadpool(
+        mikrotik_service.create_voucher,
+        code=generate_nhr_code(),
+        profile_name=profile_name
+    )
+
+
+async def issue_voucher(session: AsyncSession, cpm_trans_id: str, method: Optional[str],
+                        wait: bool = True) -> Optional[IssuedVoucher]:
+    """Émet le voucher d'une transaction payée, une seule fois ; None si la transaction n'existe pas.
+
+    La ligne de la transaction est verrouillée (SELECT ... FOR UPDATE) pendant la
+    création MikroTik ; le voucher et le passage à ACCEPTED sont commités ensemble.
+    Avec wait=False, un verrou déjà pris lève VoucherBusy au lieu d'attendre.
+    Lève MissingDeliveryProfile (verrou relâché) si le package ne peut pas être livré.
+    """
+    tx = await get_transaction_by_txid(session, cpm_trans_id)
+    if not tx:
+        return None
+    # Chemin rapide sans verrou : doublons arrivés après l'émission
+    code = await get_voucher_code_for_transaction(session, tx.id)
+    if code:
+        await session.commit()
+        return IssuedVoucher(code, False)
+
+    # rollback() expire les instances : l'id est gardé pour les relectures après un échec
+    tx_id = tx.id
+    for attempt in range(1, VOUCHER_CODE_ATTEMPTS + 1):
+        tx = await lock_transaction_by_txid(session, cpm_trans_id, skip_locked=not wait)
+        if not tx:
+            await session.rollback()
+            if not wait:
+                raise VoucherBusy(f"voucher en cours d'émission pour {cpm_trans_id}")
+            return None
+        code = await get_voucher_code_for_transaction(session, tx_id)
+        if code:
+            await session.commit()
+            return IssuedVoucher(code, False)
+
+        package = await get_package_for_delivery(session, tx.package_id) if tx.package_id else None
+        if not package or not package.mikrotik_profile_name:
+            await session.rollback()
+            raise MissingDeliveryProfile(f"package ou profil MikroTik manquant pour {cpm_trans_id}")
+        code = await create_hotspot_user(package.mikrotik_profile_name)
+        voucher = Voucher.model_validate(VoucherCreate(
+            username_voucher=code,
+            password_voucher=code,  # ou un mot de passe différent
+            user_id=tx.user_id,
+            package_id=tx.package_id,
+            transaction_id=tx_id,
+        ))
+        tx.payment_status = PaymentStatus.ACCEPTED
+        tx.payment_method = method
+        session.add(voucher)
+        session.add(tx)
+        try:
+            await session.commit()
+            return IssuedVoucher(code, True)
+        except IntegrityError:
+            await session.rollback()
+            existing = await get_voucher_code_for_transaction(session, tx_id)
+            if existing:
+                # Voucher inséré hors de ce chemin (sans verrou) : l'index unique a tranché
+                logger.warning("duplicate voucher for %s, MikroTik user %s left unused", cpm_trans_id, code)
+                await session.commit()
+                return IssuedVoucher(existing, False)
+            # Autre contrainte (ex. code déjà attribué) : nouvel essai avec un nouveau code
+            logger.warning("voucher %s for %s rejected (attempt %d), MikroTik user left unused",
+                           code, cpm_trans_id, attempt)
+            if attempt == VOUCHER_CODE_ATTEMPTS:
+                raise
+
+
+async def send_confirmation(session: AsyncSession, tx: Transaction, voucher_code: str) -> None:
+    # Le voucher est déjà livré : un échec SMTP est journalisé sans relancer le traitement
+    customer_email = await get_email_by_transaction_id(session, tx.payment_gateway_ref)
+    if not customer_email:
+        return
+    try:
+        await run_in_threadpool(
+            send_payment_confirmation_email,
+            to_email=customer_email,
+            amount=tx.amount_paid or 0.0,
+            txid=tx.payment_gateway_ref,
+            voucher_code=voucher_code
+        )
+    except Exception:
+        logger.exception("confirmation email failed for %s", tx.payment_gateway_ref)
+
+
+async def process_notification(session: AsyncSession, cpm_trans_id: str) -> str:
+    """Traite une notification CinetPay ; renvoie le résultat enregistré dans la boîte de réception."""
+    tx = await get_transaction_by_txid(session, cpm_trans_id)
+    if not tx:
+        return "IGNORED"
+    if tx.payment_status == PaymentStatus.ACCEPTED:
+        return "ALREADY_ACCEPTED"
+    # Pas de transaction SQL ouverte pendant l'appel à CinetPay
+    await session.commit()
+
+    response = await verify_transaction(cpm_trans_id, session)
+    data = (response or {}).get("data") if isinstance(response, dict) else None
+    if not data:
+        raise RetryLater("CinetPay injoignable ou réponse invalide")
+
+    status = PaymentStatus.from_gateway(data.get("status"))
+    method = data.get("payment_method")
+    if status == PaymentStatus.PENDING:
+        raise RetryLater("paiement encore en attente côté CinetPay")
+    if status == PaymentStatus.ACCEPTED:
+        # Si MikroTik échoue, rien n'est commité : la transaction reste PENDING et sera retraitée
+        issued = await issue_voucher(session, cpm_trans_id, method, wait=False)
+        if issued is None:
+            return "IGNORED"
+        if issued.created:
+            await send_confirmation(session, tx, issued.code)
+        return PaymentStatus.ACCEPTED.value
+
+    if not await settle_pending_transaction(session, cpm_trans_id, status, method):
+        return "NOT_PENDING"
+    count_cache.invalidate("transactions")
+    return status.value
@@ -0,0 +1,129 @@
+import asyncio
+import logging
+import random
+import time
+from collections import Counter
+from typing import Optional
+from config import config
+from database import AsyncSessionLocal
+from crud.notification import ClaimedNotification, claim_notifications, finish_notification, retry_notification
+from services.observability_service.sql_tracing import LatencyHistogram
+from services.payement_service.fulfilment import MissingDeliveryProfile, process_notification
+
+logger = logging.getLogger("payments")
+
+
+class NotificationInbox:
+    """Pool de workers qui vide la boîte de réception des webhooks CinetPay.
+
+    Le webhook ne fait qu'enregistrer la notification (une ligne par
+    cpm_trans_id) ; chaque worker réserve un lot de lignes dues avec
+    FOR UPDATE SKIP LOCKED et les traite une à une, ce qui borne la
+    concurrence vers CinetPay et MikroTik au nombre de workers. Un échec
+    reprogramme la ligne avec un backoff exponentiel ; au-delà de
+    `max_attempts` elle passe en FAILED.
+    """
+
+    def __init__(self, enabled: bool, workers: int, batch_size: int, poll_seconds: float, lease_seconds: float,
+                 max_attempts: int, backoff_seconds: float, backoff_max_seconds: float):
+        self.enabled = enabled
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self._wakeup = asyncio.Event()
+        self._tasks: list[asyncio.Task] = []
+        self.outcomes: Counter = Counter()
+        self.retried = 0
+        self.failed = 0
+        self.last_error: Optional[str] = None
+        self.latency = LatencyHistogram(max_shapes=20, key="outcome")
+
+    def wake(self) -> None:
+        # Appelé par le webhook après l'enregistrement : évite d'attendre le prochain sondage
+        self._wakeup.set()
+
+    def _retry_delay(self, attempts: int) -> float:
+        # Moitié fixe, moitié aléatoire : pas de reprise immédiate, pas de vague synchronisée
+        delay = min(self.backoff_max_seconds, self.backoff_seconds * 2 ** (attempts - 1))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    async def _handle(self, notification: ClaimedNotification) -> None:
+        start = time.perf_counter()
+        async with AsyncSessionLocal() as session:
+            try:
+                outcome = await process_notification(session, notification.cpm_trans_id)
+            except Exception as exc:
+                await session.rollback()
+                # Package non livrable : abandon immédiat, un nouveau webhook la remettra en file
+                give_up = isinstance(exc, MissingDeliveryProfile) or notification.attempts >= self.max_attempts
+                outcome = "FAILED" if give_up else "RETRY"
+                self.last_error = f"{notification.cpm_trans_id}: {exc!r}"
+                logger.warning("payment notification %s attempt %d failed: %r",
+                               notification.cpm_trans_id, notification.attempts, exc)
+                await retry_notification(session, notification.id, repr(exc)[:500],
+                                         self._retry_delay(notification.attempts), give_up)
+                if give_up:
+                    self.failed += 1
+                else:
+                    self.retried += 1
+            else:
+                await finish_notification(session, notification, outcome)
+        self.outcomes[outcome] += 1
+        self.latency.observe(outcome, (time.perf_counter() - start) * 1000)
+
+    async def _run(self) -> None:
+        while True:
+            claimed = []
+            try:
+                async with AsyncSessionLocal() as session:
+                    claimed = await claim_notifications(session, self.batch_size, self.lease_seconds)
+                for notification in claimed:
+                    await self._handle(notification)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                # Base indisponible : la ligne en cours sera reprise à l'expiration de son bail
+                self.last_error = repr(exc)
+                logger.exception("payment inbox worker error")
+            if len(claimed) < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+
+    def start(self) -> None:
+        if self.enabled and not self._tasks:
+            self._tasks = [asyncio.create_task(self._run()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self) -> dict:
+        return {
+            "workers": len(self._tasks),
+            "outcomes": dict(self.outcomes),
+            "retried": self.retried,
+            "failed": self.failed,
+            "last_error": self.last_error,
+            "latency": self.latency.snapshot(),
+        }
+
+
+notification_inbox = NotificationInbox(
+    enabled=config.payment_inbox_enabled,
+    workers=config.payment_inbox_workers,
+    batch_size=config.payment_inbox_batch_size,
+    poll_seconds=config.payment_inbox_poll_seconds,
+    lease_seconds=config.payment_inbox_lease_seconds,
+    max_attempts=config.payment_inbox_max_attempts,
+    backoff_seconds=config.payment_inbox_backoff_seconds,
+    backoff_max_seconds=config.payment_inbox_backoff_max_seconds,
+)
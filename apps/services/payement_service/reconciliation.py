@@ -0,0 +1,197 @@
+import asyncio
+import logging
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from sqlalchemy import text
+from config import config
+from database import AsyncSessionLocal, async_engine
+from apps.models.enums import PaymentStatus
+from crud.transaction import (bulk_update_transaction_status, count_stale_pending, get_transaction_by_txid,
+                              stale_pending_transactions)
+from services.cache_service.counters import count_cache
+from services.payement_service.cinetpay_service import verify_transaction
+from services.payement_service.fulfilment import MissingDeliveryProfile, VoucherBusy, issue_voucher, send_confirmation
+
+logger = logging.getLogger("payments")
+
+# Clé du verrou consultatif PostgreSQL : un seul worker réconcilie à la fois
+LOCK_KEY = 0x52_45_43_4F  # "RECO"
+
+
+class Reconciler:
+    """Réconciliation périodique des transactions PENDING dont le webhook n'est jamais arrivé.
+
+    Parcourt les transactions PENDING anciennes par lots dans l'ordre de
+    l'index (payment_status, created_at), vérifie chaque lot auprès de
+    CinetPay avec au plus `concurrency` appels simultanés, applique les refus
+    en un seul UPDATE par lot et émet les vouchers des paiements acceptés.
+    """
+
+    def __init__(self, enabled: bool, interval_seconds: float, stale_after: timedelta, max_age: timedelta,
+                 batch_size: int, concurrency: int, max_per_run: int):
+        self.enabled = enabled
+        self.interval_seconds = interval_seconds
+        self.stale_after = stale_after
+        self.max_age = max_age
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.max_per_run = max_per_run
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.running = False
+        self.runs = 0
+        self.skipped_runs = 0
+        self.totals: Counter = Counter()
+        self.last_run: Optional[dict] = None
+        self.backlog: Optional[int] = None
+        self.last_error: Optional[str] = None
+
+    def wake(self) -> None:
+        self._wakeup.set()
+
+    async def _verify(self, semaphore: asyncio.Semaphore, txid: str) -> Optional[dict]:
+        async with semaphore:
+            response = await verify_transaction(txid)
+        return (response or {}).get("data") if isinstance(response, dict) else None
+
+    async def _issue(self, semaphore: asyncio.Semaphore, txid: str, method: Optional[str]) -> str:
+        async with semaphore:
+            async with AsyncSessionLocal() as session:
+                try:
+                    issued = await issue_voucher(session, txid, method, wait=False)
+                    if issued is None or not issued.code:
+                        return "skipped"  # transaction supprimée depuis le parcours
+                    if issued.created:
+                        # Un webhook tardif s'arrêtera à ALREADY_ACCEPTED : c'est le seul envoi
+                        tx = await get_transaction_by_txid(session, txid)
+                        if tx:
+                            await send_confirmation(session, tx, issued.code)
+                    return "accepted"
+                except VoucherBusy:
+                    return "busy"  # la boîte de réception l'émet déjà
+                except MissingDeliveryProfile as exc:
+                    logger.warning("reconciliation voucher for %s not deliverable: %s", txid, exc)
+                    return "undeliverable"
+                except Exception as exc:
+                    logger.warning("reconciliation voucher for %s failed: %r", txid, exc)
+                    return "errors"
+
+    async def _reconcile_batch(self, rows: list, counts: Counter) -> None:
+        semaphore = asyncio.Semaphore(self.concurrency)
+        results = await asyncio.gather(*(self._verify(semaphore, row.payment_gateway_ref) for row in rows))
+        refused, accepted = [], []
+        for row, data in zip(rows, results):
+            if not data:
+                counts["errors"] += 1
+                continue
+            status = PaymentStatus.from_gateway(data.get("status"))
+            if status == PaymentStatus.ACCEPTED:
+                accepted.append((row.payment_gateway_ref, data.get("payment_method")))
+            elif status == PaymentStatus.PENDING:
+                counts["still_pending"] += 1
+            else:
+                refused.append((row.id, status, data.get("payment_method")))
+        if refused:
+            async with AsyncSessionLocal() as session:
+                counts["refused"] += await bulk_update_transaction_status(session, refused)
+            count_cache.invalidate("transactions")
+        # Les acceptations passent par issue_voucher : voucher et statut commités ensemble
+        outcomes = await asyncio.gather(*(self._issue(semaphore, txid, method) for txid, method in accepted))
+        counts.update(outcomes)
+
+    async def run_once(self) -> Optional[dict]:
+        """Une passe complète ; None si un autre worker détient le verrou."""
+        async with async_engine.connect() as connection:
+            connection = await connection.execution_options(isolation_level="AUTOCOMMIT")
+            locked = (await connection.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": LOCK_KEY})).scalar()
+            if not locked:
+                self.skipped_runs += 1
+                return None
+            try:
+                return await self._run_locked()
+            finally:
+                await connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": LOCK_KEY})
+
+    async def _run_locked(self) -> dict:
+        self.running = True
+        started_at = datetime.now(timezone.utc)
+        start = time.perf_counter()
+        counts: Counter = Counter()
+        after = None
+        try:
+            while counts["scanned"] < self.max_per_run:
+                async with AsyncSessionLocal() as session:
+                    limit = min(self.batch_size, self.max_per_run - counts["scanned"])
+                    rows = await stale_pending_transactions(session, self.stale_after, self.max_age, after, limit)
+                if not rows:
+                    break
+                counts["batches"] += 1
+                counts["scanned"] += len(rows)
+                after = (rows[-1].created_at, rows[-1].id)
+                await self._reconcile_batch(rows, counts)
+            async with AsyncSessionLocal() as session:
+                self.backlog = await count_stale_pending(session, self.stale_after, self.max_age)
+        finally:
+            self.running = False
+        duration = time.perf_counter() - start
+        self.runs += 1
+        self.totals.update(counts)
+        self.last_run = {
+            "started_at": started_at.isoformat(),
+            "duration_seconds": round(duration, 3),
+            "throughput_per_second": round(counts["scanned"] / duration, 1) if duration else None,
+            **counts,
+        }
+        return self.last_run
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                self.last_error = repr(exc)
+                logger.exception("payment reconciliation run failed")
+
+    def start(self) -> None:
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "runs": self.runs,
+            "skipped_runs": self.skipped_runs,
+            "backlog": self.backlog,
+            "last_run": self.last_run,
+            "totals": dict(self.totals),
+            "last_error": self.last_error,
+        }
+
+
+reconciler = Reconciler(
+    enabled=config.reconciliation_enabled,
+    interval_seconds=config.reconciliation_interval_seconds,
+    stale_after=timedelta(seconds=config.reconciliation_stale_after_seconds),
+    max_age=timedelta(hours=config.reconciliation_max_age_hours),
+    batch_size=config.reconciliation_batch_size,
+    concurrency=config.reconciliation_concurrency,
+    max_per_run=config.reconciliation_max_per_run,
+)
@@ -0,0 +1,76 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+from apps.models.enums import PaymentStatus
+from config import config
+
+TERMINAL = (PaymentStatus.ACCEPTED, PaymentStatus.REFUSED)
+
+
+def is_terminal(response: Optional[dict]) -> bool:
+    data = (response or {}).get("data") or {}
+    return isinstance(data, dict) and data.get("status") in TERMINAL
+
+
+class VerificationCache:
+    """Vérifications CinetPay partagées par transaction.
+
+    Les appels simultanés pour un même transaction_id (retries du webhook,
+    polling du front, réconciliation) attendent le même appel sortant. Les
+    réponses terminales (ACCEPTED / REFUSED) sont gardées `ttl_seconds` ; une
+    réponse PENDING ou une erreur ne l'est jamais.
+    """
+
+    def __init__(self, ttl_seconds: int, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._inflight: dict[str, asyncio.Task] = {}
+        self._terminal: OrderedDict[str, tuple[dict, float]] = OrderedDict()
+        self.hits = 0
+        self.coalesced = 0
+        self.calls = 0
+
+    async def get(self, transaction_id: str, loader: Callable[[str], Awaitable[Optional[dict]]]) -> Optional[dict]:
+        entry = self._terminal.get(transaction_id)
+        if entry is not None and entry[1] > time.monotonic():
+            self._terminal.move_to_end(transaction_id)
+            self.hits += 1
+            return entry[0]
+        task = self._inflight.get(transaction_id)
+        if task is None:
+            self.calls += 1
+            task = asyncio.ensure_future(loader(transaction_id))
+            self._inflight[transaction_id] = task
+            task.add_done_callback(lambda done: self._settle(transaction_id, done))
+        else:
+            self.coalesced += 1
+        # shield : l'annulation d'un appelant n'interrompt pas l'appel partagé
+        return await asyncio.shield(task)
+
+    def _settle(self, transaction_id: str, task: asyncio.Task) -> None:
+        self._inflight.pop(transaction_id, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        response = task.result()
+        if is_terminal(response):
+            self._terminal[transaction_id] = (response, time.monotonic() + self.ttl_seconds)
+            self._terminal.move_to_end(transaction_id)
+            while len(self._terminal) > self.max_entries:
+                self._terminal.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._terminal),
+            "in_flight": len(self._inflight),
+            "hits": self.hits,
+            "coalesced": self.coalesced,
+            "calls": self.calls,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+
+verifications = VerificationCache(
+    ttl_seconds=config.cinetpay_verification_ttl_seconds,
+    max_entries=config.cinetpay_verification_cache_size,
+)
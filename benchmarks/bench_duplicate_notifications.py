@@ -0,0 +1,148 @@
+"""Émission du voucher sous 100 notifications CinetPay simultanées pour une même transaction.
+
+Usage (depuis la racine du dépôt, base migrée, .env présent) :
+    python benchmarks/bench_duplicate_notifications.py --duplicates 100 --mikrotik-ms 300
+
+Crée un package et une transaction PENDING synthétiques (préfixe "bench-"),
+puis lance --duplicates appels concurrents, chacun avec sa propre session :
+  - "webhook" : process_notification (wait=False) ; un verrou déjà pris lève
+    VoucherBusy et l'appel est rejoué comme le ferait la boîte de réception ;
+  - "admin"   : issue_voucher (wait=True), chemin de /payments/activate-forfait.
+CinetPay, MikroTik et l'email sont remplacés par des attentes simulées : seule
+la base est réelle. Vérifie qu'un seul voucher et un seul utilisateur hotspot
+sont créés et, pour les webhooks, qu'un seul email part ; code de sortie 1
+sinon. Les lignes créées sont supprimées. tests/test_duplicate_notifications.py
+rejoue ce scénario sous pytest.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+import uuid
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+sys.path[:0] = [ROOT, os.path.join(ROOT, "apps"), os.path.join(ROOT, "apps", "config")]
+
+from sqlalchemy import delete, func  # noqa: E402
+from sqlmodel import select  # noqa: E402
+from database import AsyncSessionLocal  # noqa: E402
+from apps.models.models import Package, Transaction, Voucher  # noqa: E402
+from apps.models.enums import PaymentStatus  # noqa: E402
+from services.payement_service import fulfilment  # noqa: E402
+
+
+class Simulated:
+    def __init__(self, gateway_ms: float, mikrotik_ms: float):
+        self.gateway_ms = gateway_ms
+        self.mikrotik_ms = mikrotik_ms
+        self.hotspot_users = 0
+        self.emails = 0
+
+    async def verify_transaction(self, transaction_id, session):
+        await asyncio.sleep(self.gateway_ms / 1000)
+        return {"code": "00", "data": {"status": "ACCEPTED", "payment_method": "OM"}}
+
+    async def create_hotspot_user(self, profile_name):
+        await asyncio.sleep(self.mikrotik_ms / 1000)
+        self.hotspot_users += 1
+        return f"bench-{uuid.uuid4().hex[:12]}"
+
+    async def send_confirmation(self, session, tx, voucher_code):
+        self.emails += 1
+
+    def install(self):
+        fulfilment.verify_transaction = self.verify_transaction
+        fulfilment.create_hotspot_user = self.create_hotspot_user
+        fulfilment.send_confirmation = self.send_confirmation
+
+
+async def setup() -> tuple[str, Package, Transaction]:
+    tag = uuid.uuid4().hex[:12]
+    async with AsyncSessionLocal() as session:
+        package = Package(name=f"bench-{tag}", price=500.0, validity_hours=24, mikrotik_profile_name=f"bench-{tag}")
+        session.add(package)
+        await session.flush()
+        tx = Transaction(package_id=package.id, amount_paid=500.0, payment_method="OM",
+                         payment_status=PaymentStatus.PENDING, payment_gateway_ref=f"TX-bench-{tag}")
+        session.add(tx)
+        await session.commit()
+        return tx.payment_gateway_ref, package, tx
+
+
+async def cleanup(package: Package, tx: Transaction) -> None:
+    async with AsyncSessionLocal() as session:
+        await session.exec(delete(Voucher).where(Voucher.transaction_id == tx.id))
+        await session.exec(delete(Transaction).where(Transaction.id == tx.id))
+        await session.exec(delete(Package).where(Package.id == package.id))
+        await session.commit()
+
+
+async def webhook_call(txid: str) -> tuple[float, int]:
+    start = time.perf_counter()
+    replays = 0
+    while True:
+        async with AsyncSessionLocal() as session:
+            try:
+                await fulfilment.process_notification(session, txid)
+                return (time.perf_counter() - start) * 1000, replays
+            except fulfilment.VoucherBusy:
+                replays += 1
+        await asyncio.sleep(0.05)
+
+
+async def admin_call(txid: str) -> tuple[float, int]:
+    start = time.perf_counter()
+    async with AsyncSessionLocal() as session:
+        await fulfilment.issue_voucher(session, txid, method="MANUAL")
+    return (time.perf_counter() - start) * 1000, 0
+
+
+async def run(mode: str, duplicates: int, simulated: Simulated) -> dict:
+    txid, package, tx = await setup()
+    simulated.hotspot_users = simulated.emails = 0
+    call = webhook_call if mode == "webhook" else admin_call
+    try:
+        start = time.perf_counter()
+        results = await asyncio.gather(*(call(txid) for _ in range(duplicates)))
+        wall = time.perf_counter() - start
+        async with AsyncSessionLocal() as session:
+            vouchers = (await session.exec(
+                select(func.count()).select_from(Voucher).where(Voucher.transaction_id == tx.id))).one()
+            status = (await session.exec(select(Transaction.payment_status).where(Transaction.id == tx.id))).one()
+    finally:
+        await cleanup(package, tx)
+
+    latencies = sorted(ms for ms, _ in results)
+    # L'activation manuelle n'envoie pas l'email elle-même (tâche de fond de la route)
+    expected_emails = 1 if mode == "webhook" else 0
+    ok = (vouchers == 1 and simulated.hotspot_users == 1 and simulated.emails == expected_emails
+          and status == PaymentStatus.ACCEPTED)
+    print(f"{mode}: {duplicates} appels en {wall:.2f} s")
+    print(f"  latence p50 {statistics.median(latencies):.0f} ms, "
+          f"p95 {latencies[int(0.95 * (len(latencies) - 1))]:.0f} ms, max {latencies[-1]:.0f} ms")
+    print(f"  rejoués (VoucherBusy) : {sum(replays for _, replays in results)}")
+    print(f"  vouchers {vouchers}, utilisateurs hotspot {simulated.hotspot_users}, "
+          f"emails {simulated.emails}, statut {status} -> {'OK' if ok else 'ÉCHEC'}")
+    return {"ok": ok, "vouchers": vouchers, "hotspot_users": simulated.hotspot_users,
+            "emails": simulated.emails, "expected_emails": expected_emails, "status": status}
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--duplicates", type=int, default=100)
+    parser.add_argument("--gateway-ms", type=float, default=50)
+    parser.add_argument("--mikrotik-ms", type=float, default=300)
+    parser.add_argument("--mode", choices=["webhook", "admin", "both"], default="both")
+    args = parser.parse_args()
+
+    simulated = Simulated(args.gateway_ms, args.mikrotik_ms)
+    simulated.install()
+    modes = ["webhook", "admin"] if args.mode == "both" else [args.mode]
+    results = [await run(mode, args.duplicates, simulated) for mode in modes]
+    sys.exit(0 if all(result["ok"] for result in results) else 1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,140 @@
+"""Taille des index et temps de scan : statut / payment_status en varchar vs ENUM.
+
+Usage (depuis la racine du dépôt, base PostgreSQL accessible, .env présent) :
+    python benchmarks/bench_enum_storage.py --rows 1000000 --repeat 5
+
+Crée deux tables jetables (bench_enum_varchar, bench_enum_enum) calquées sur
+"transaction", les remplit des mêmes lignes synthétiques (generate_series,
+même graine) et pose les index de 7f3e9a0c2d41 qui portent sur ces colonnes :
+partiel "non supprimé" sur (created_at, id) et composite (payment_status,
+created_at). Affiche pg_relation_size de la table et de chaque index, puis le temps
+d'exécution médian et les buffers lus par EXPLAIN (ANALYZE, BUFFERS) pour les
+requêtes chaudes correspondantes.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+sys.path[:0] = [ROOT, os.path.join(ROOT, "apps"), os.path.join(ROOT, "apps", "config")]
+
+from database import engine  # noqa: E402
+
+TYPES = """
+DROP TYPE IF EXISTS bench_statut;
+DROP TYPE IF EXISTS bench_payment_status;
+CREATE TYPE bench_statut AS ENUM ('active', 'deleted', 'used', 'expired', 'refunded', 'chargeback');
+CREATE TYPE bench_payment_status AS ENUM ('PENDING', 'ACCEPTED', 'REFUSED');
+"""
+
+# Même répartition pour les deux tables : 5 % supprimées, 5 % PENDING, 5 % REFUSED
+FILL = """
+SELECT setseed(0.42);
+INSERT INTO {table} (id, statut, payment_status, created_at)
+SELECT gen_random_uuid(),
+       (CASE WHEN r1 < 0.05 THEN 'deleted' ELSE 'active' END)::{statut},
+       (CASE WHEN r2 < 0.05 THEN 'PENDING' WHEN r2 < 0.10 THEN 'REFUSED' ELSE 'ACCEPTED' END)::{payment_status},
+       timestamp '2026-01-01' + n * interval '1 second'
+FROM (SELECT n, random() AS r1, random() AS r2 FROM generate_series(1, {rows}) AS n) AS s
+"""
+
+VARIANTS = {
+    "varchar": {"statut": "varchar", "payment_status": "varchar"},
+    "enum": {"statut": "bench_statut", "payment_status": "bench_payment_status"},
+}
+
+INDEXES = [
+    ("live_created_at", "(created_at, id) WHERE statut <> 'deleted'"),
+    ("payment_status_created_at", "(payment_status, created_at)"),
+]
+
+# (titre, requête, seq scan imposé) : le comptage compare le coût du filtre, pas le plan
+QUERIES = [
+    ("PENDING anciennes (index)",
+     "SELECT id FROM {table} WHERE payment_status = 'PENDING' AND created_at < timestamp '2026-01-05' "
+     "ORDER BY created_at LIMIT 100", False),
+    ("liste non supprimées (index partiel)",
+     "SELECT id FROM {table} WHERE statut <> 'deleted' ORDER BY created_at, id LIMIT 100", False),
+    ("comptage non supprimées (seq scan)",
+     "SELECT count(*) FROM {table} WHERE statut <> 'deleted'", True),
+    ("comptage par payment_status (seq scan)",
+     "SELECT payment_status, count(*) FROM {table} GROUP BY payment_status", True),
+]
+
+SEQ_SCAN_ONLY = ("enable_indexscan", "enable_indexonlyscan", "enable_bitmapscan")
+
+
+def build(cursor, label: str, rows: int) -> None:
+    table = f"bench_enum_{label}"
+    variant = VARIANTS[label]
+    cursor.execute(f"DROP TABLE IF EXISTS {table}")
+    cursor.execute(
+        f"CREATE TABLE {table} (id uuid PRIMARY KEY, statut {variant['statut']} NOT NULL, "
+        f"payment_status {variant['payment_status']} NOT NULL, created_at timestamp NOT NULL)"
+    )
+    cursor.execute(FILL.format(table=table, rows=rows, **variant))
+    for suffix, definition in INDEXES:
+        cursor.execute(f"CREATE INDEX {table}_{suffix} ON {table} {definition}")
+    cursor.execute(f"VACUUM ANALYZE {table}")
+
+
+def sizes(cursor, label: str) -> dict:
+    table = f"bench_enum_{label}"
+    names = [table] + [f"{table}_{suffix}" for suffix, _ in INDEXES]
+    cursor.execute("SELECT " + ", ".join("pg_relation_size(%s)" for _ in names), names)
+    return dict(zip(["table"] + [suffix for suffix, _ in INDEXES], cursor.fetchone()))
+
+
+def explain(cursor, sql: str, repeat: int, seq_scan: bool) -> tuple[float, int]:
+    for setting in SEQ_SCAN_ONLY:
+        cursor.execute(f"SET {setting} = {'off' if seq_scan else 'on'}")
+    timings, buffers = [], 0
+    for _ in range(repeat):
+        cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}")
+        plan = cursor.fetchone()[0]
+        plan = json.loads(plan) if isinstance(plan, str) else plan
+        timings.append(plan[0]["Execution Time"])
+        buffers = plan[0]["Plan"]["Shared Hit Blocks"] + plan[0]["Plan"]["Shared Read Blocks"]
+    return statistics.median(timings), buffers
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--keep", action="store_true", help="conserver les tables après la mesure")
+    args = parser.parse_args()
+
+    connection = engine.raw_connection()
+    connection.dbapi_connection.autocommit = True  # VACUUM hors transaction
+    try:
+        cursor = connection.cursor()
+        cursor.execute(TYPES)
+        for label in VARIANTS:
+            build(cursor, label, args.rows)
+
+        measured = {label: sizes(cursor, label) for label in VARIANTS}
+        print(f"{'relation':<28}" + "".join(f"{label:>12}" for label in VARIANTS))
+        for name in measured["varchar"]:
+            print(f"{name:<28}" + "".join(f"{measured[label][name] / 2**20:10.1f}Mo" for label in VARIANTS))
+
+        print(f"\n{'requête':<40}" + "".join(f"{label:>22}" for label in VARIANTS))
+        for title, sql, seq_scan in QUERIES:
+            cells = []
+            for label in VARIANTS:
+                elapsed, buffers = explain(cursor, sql.format(table=f"bench_enum_{label}"), args.repeat, seq_scan)
+                cells.append(f"{elapsed:9.2f} ms {buffers:7d} buf")
+            print(f"{title:<40}" + "".join(f"{cell:>22}" for cell in cells))
+
+        if not args.keep:
+            for label in VARIANTS:
+                cursor.execute(f"DROP TABLE IF EXISTS bench_enum_{label}")
+            cursor.execute("DROP TYPE IF EXISTS bench_statut; DROP TYPE IF EXISTS bench_payment_status")
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Latence d'une page de /vouchers/get_all/ : offset/limit vs curseur (keyset).
+
+Usage (depuis la racine du dépôt, base migrée, .env présent) :
+    python benchmarks/bench_keyset_pagination.py --seed 1000000 --pages 1 100 10000
+
+--seed insère des vouchers synthétiques (préfixe "bench-") supprimés en fin de
+mesure. Pour chaque page demandée, la requête offset et la requête keyset
+équivalente sont exécutées --repeat fois ; on affiche la médiane. Le curseur de
+la page N est obtenu hors chronométrage.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+sys.path[:0] = [ROOT, os.path.join(ROOT, "apps"), os.path.join(ROOT, "apps", "config")]
+
+from sqlalchemy import delete, insert  # noqa: E402
+from sqlmodel import Session, select  # noqa: E402
+from database import engine  # noqa: E402
+from apps.models.models import Voucher, live  # noqa: E402
+from apps.models.ids import uuid7  # noqa: E402
+from crud.pagination import encode_cursor, keyset_query  # noqa: E402
+
+PAGE_SIZE = 100
+KEY = (Voucher.generated_at, Voucher.id)
+BASE = select(Voucher).where(live(Voucher))
+
+
+def seed(session: Session, rows: int, batch: int = 10_000) -> None:
+    start = datetime.now(timezone.utc) - timedelta(seconds=rows)
+    for offset in range(0, rows, batch):
+        session.connection().execute(insert(Voucher.__table__), [
+            {
+                "id": uuid7(),
+                "username_voucher": f"bench-{offset + i}",
+                "password_voucher": "bench",
+                "generated_at": start + timedelta(seconds=offset + i),
+            }
+            for i in range(min(batch, rows - offset))
+        ])
+        session.commit()
+    session.connection().exec_driver_sql("ANALYZE voucher")
+    session.commit()
+
+
+def median_ms(session: Session, stmt, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        session.exec(stmt).all()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 100, 10_000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with Session(engine) as session:
+        if args.seed:
+            seed(session, args.seed)
+        try:
+            for page in args.pages:
+                skipped = (page - 1) * PAGE_SIZE
+                cursor = None
+                if skipped:
+                    last = session.exec(BASE.order_by(*KEY).offset(skipped - 1).limit(1)).first()
+                    if last is None:
+                        print(f"page {page:>6}: pas assez de lignes")
+                        continue
+                    cursor = encode_cursor([last.generated_at, last.id])
+                offset_ms = median_ms(session, BASE.order_by(*KEY).offset(skipped).limit(PAGE_SIZE), args.repeat)
+                keyset_ms = median_ms(session, keyset_query(BASE, KEY, cursor, PAGE_SIZE), args.repeat)
+                print(f"page {page:>6}: offset {offset_ms:9.2f} ms   keyset {keyset_ms:7.2f} ms")
+        finally:
+            if args.seed:
+                session.exec(delete(Voucher).where(Voucher.username_voucher.startswith("bench-")))
+                session.commit()
+
+
+if __name__ == "__main__":
+    main()
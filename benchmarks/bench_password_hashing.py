@@ -0,0 +1,70 @@
+"""Débit de login (vérification bcrypt) avant/après le pool de hachage.
+
+Usage (depuis la racine du dépôt) :
+    python benchmarks/bench_password_hashing.py --requests 64 --workers 4
+
+"inline" reproduit l'ancien comportement : verify() appelé directement dans la
+coroutine, ce qui bloque la boucle. "pool" passe par PasswordHashingPool.
+La latence d'un ping concurrent montre à quel point la boucle reste réactive.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from passlib.context import CryptContext  # noqa: E402
+from apps.services.auth_service.hashing_pool import PasswordHashingPool  # noqa: E402
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+async def ping_latency(stop: asyncio.Event) -> float:
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.001)
+        worst = max(worst, time.perf_counter() - start)
+    return worst
+
+
+async def run(mode: str, hashed: str, n: int, workers: int) -> None:
+    pool = PasswordHashingPool(max_workers=workers)
+
+    async def login():
+        if mode == "inline":
+            return pwd_context.verify("secret", hashed)
+        return await pool.run(pwd_context.verify, "secret", hashed)
+
+    stop = asyncio.Event()
+    pinger = asyncio.create_task(ping_latency(stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(n)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    worst_ping = await pinger
+    pool.shutdown()
+
+    cores = min(workers, os.cpu_count() or 1) if mode == "pool" else 1
+    print(
+        f"{mode:>6}: {n / elapsed:7.1f} login/s total, "
+        f"{n / elapsed / cores:7.1f} login/s/core, "
+        f"pire latence boucle {worst_ping * 1000:8.1f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    hashed = pwd_context.hash("secret")
+    for mode in ("inline", "pool"):
+        asyncio.run(run(mode, hashed, args.requests, args.workers))
+
+
+if __name__ == "__main__":
+    main()
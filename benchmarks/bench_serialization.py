@@ -0,0 +1,85 @@
+"""Coût de sérialisation d'une page de liste, par tranche de 1 000 lignes.
+
+Usage (depuis la racine du dépôt, .env présent) :
+    python benchmarks/bench_serialization.py --rows 1000 --iterations 200
+
+"pydantic" reproduit le chemin response_model de FastAPI : objets SQLModel
+validés par le schéma de lecture, dump en mode JSON puis json.dumps.
+"tuples" part des lignes d'un select() de colonnes, construit les dicts
+directement et les passe à fast_json.dumps (orjson si installé, json sinon).
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+sys.path[:0] = [ROOT, os.path.join(ROOT, "apps"), os.path.join(ROOT, "apps", "config")]
+
+from pydantic import TypeAdapter  # noqa: E402
+from apps.models.models import Transaction, Voucher  # noqa: E402
+from apps.models.enums import PaymentStatus, Statut  # noqa: E402
+from apps.models.ids import uuid7  # noqa: E402
+from schema.pagination import Page  # noqa: E402
+from schema.transaction import TransactionReadSimple  # noqa: E402
+from schema.voucher import VoucherReadSimple  # noqa: E402
+from services.export_service import fast_json  # noqa: E402
+
+
+def synthetic(rows: int):
+    start = datetime.now(timezone.utc)
+    vouchers = [
+        Voucher(id=uuid7(), username_voucher=f"V{i:08d}", password_voucher=f"V{i:08d}", user_id=uuid7(),
+                package_id=uuid7(), generated_at=start + timedelta(seconds=i), statut=Statut.ACTIVE)
+        for i in range(rows)
+    ]
+    transactions = [
+        Transaction(id=uuid7(), user_id=uuid7(), package_id=uuid7(), amount_paid=500.0, payment_method="OM",
+                    payment_status=PaymentStatus.ACCEPTED, payment_gateway_ref=f"TX-{i:012d}",
+                    created_at=start + timedelta(seconds=i))
+        for i in range(rows)
+    ]
+    return {"vouchers": (VoucherReadSimple, vouchers), "transactions": (TransactionReadSimple, transactions)}
+
+
+def pydantic_path(adapter: TypeAdapter, objects: list) -> bytes:
+    page = adapter.validate_python({"items": objects, "next_cursor": None}, from_attributes=True)
+    content = adapter.dump_python(page, mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+
+def tuples_path(fields: list, rows: list) -> bytes:
+    return fast_json.dumps({"items": fast_json.rows_to_dicts(fields, rows), "next_cursor": None})
+
+
+def measure(label: str, fn, iterations: int, rows: int) -> float:
+    fn()  # échauffement (construction des validateurs)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    per_thousand = (time.perf_counter() - start) / iterations * 1000 / rows * 1000
+    print(f"  {label:<22} {per_thousand:8.2f} ms / 1 000 lignes")
+    return per_thousand
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"encodeur rapide : {'orjson' if fast_json.orjson is not None else 'json (orjson absent)'}")
+    for name, (schema, objects) in synthetic(args.rows).items():
+        fields = list(schema.model_fields)
+        rows = [tuple(getattr(obj, field) for field in fields) for obj in objects]
+        adapter = TypeAdapter(Page[schema])
+        print(name)
+        slow = measure("response_model", lambda: pydantic_path(adapter, objects), args.iterations, args.rows)
+        fast = measure("tuples -> dicts", lambda: tuples_path(fields, rows), args.iterations, args.rows)
+        print(f"  gain x{slow / fast:.1f}")
+
+
+if __name__ == "__main__":
+    main()
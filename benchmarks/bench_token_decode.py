@@ -0,0 +1,62 @@
+"""Coût d'authentification par requête : décodage JWT brut vs cache des jetons vérifiés.
+
+Usage (depuis la racine du dépôt, .env présent) :
+    python benchmarks/bench_token_decode.py --iterations 100000
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import timedelta
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+sys.path[:0] = [ROOT, os.path.join(ROOT, "apps"), os.path.join(ROOT, "apps", "config")]
+
+from services.auth_service.token_codec import decode_token, decode_token_data, verified_tokens  # noqa: E402
+from services.auth_service.auth import create_access_token  # noqa: E402
+from schema.auth import TokenData  # noqa: E402
+
+
+def uncached(token: str) -> TokenData:
+    payload = decode_token(token)
+    return TokenData(
+        username=payload.get("sub"),
+        scopes=payload.get("scopes", []),
+        user_id=payload.get("uid"),
+        role=payload.get("role"),
+        statut=payload.get("statut"),
+        token_version=payload.get("ver"),
+    )
+
+
+def measure(label: str, fn, token: str, iterations: int) -> None:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn(token)
+    elapsed = time.perf_counter() - start
+    print(f"{label:>9}: {elapsed * 1e6 / iterations:8.2f} µs/requête")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=100000)
+    args = parser.parse_args()
+
+    token = create_access_token(
+        data={
+            "sub": "bench",
+            "scopes": ["user"],
+            "uid": "0190c3a2-5b1e-7c4d-8e2f-3a4b5c6d7e8f",
+            "role": "user",
+            "statut": "active",
+            "ver": 0,
+        },
+        expires_delta=timedelta(minutes=30),
+    )
+    measure("sans cache", uncached, token, args.iterations)
+    measure("avec cache", decode_token_data, token, args.iterations)
+    print(verified_tokens.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Débit d'insertion et taille de l'index primaire : uuid4 vs UUIDv7.
+
+Usage (depuis la racine du dépôt, base PostgreSQL accessible, .env présent) :
+    python benchmarks/bench_uuid7_inserts.py --rows 1000000 --batch 5000
+
+Crée deux tables jetables (bench_tx_uuid4, bench_tx_uuid7) calquées sur
+"transaction", y insère le même nombre de transactions synthétiques et compare
+le débit ainsi que la taille de la clé primaire. Avec uuid4 chaque insertion
+touche une page feuille aléatoire du B-tree (splits, pages à moitié vides) ;
+avec UUIDv7 les insertions se font en fin d'index.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timezone
+from uuid import uuid4
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+sys.path[:0] = [ROOT, os.path.join(ROOT, "apps"), os.path.join(ROOT, "apps", "config")]
+
+from psycopg2.extras import execute_values, register_uuid  # noqa: E402
+from database import engine  # noqa: E402
+from apps.models.ids import uuid7  # noqa: E402
+
+DDL = """
+CREATE TABLE {table} (
+    id uuid PRIMARY KEY,
+    user_id uuid,
+    package_id uuid,
+    amount_paid double precision NOT NULL,
+    payment_gateway_ref varchar NOT NULL,
+    created_at timestamptz NOT NULL
+)
+"""
+
+GENERATORS = {"uuid4": uuid4, "uuid7": uuid7}
+
+
+def run(cursor, label: str, rows: int, batch: int, users: list, packages: list) -> None:
+    table = f"bench_tx_{label}"
+    new_id = GENERATORS[label]
+    cursor.execute(f"DROP TABLE IF EXISTS {table}")
+    cursor.execute(DDL.format(table=table))
+    cursor.connection.commit()
+
+    start = time.perf_counter()
+    for offset in range(0, rows, batch):
+        now = datetime.now(timezone.utc)
+        values = [
+            (new_id(), random.choice(users), random.choice(packages), 500.0, f"TX-{offset + i:012d}", now)
+            for i in range(min(batch, rows - offset))
+        ]
+        execute_values(cursor, f"INSERT INTO {table} VALUES %s", values, page_size=batch)
+        cursor.connection.commit()
+    elapsed = time.perf_counter() - start
+
+    cursor.execute("SELECT pg_relation_size(%s), pg_relation_size(%s)", (table, f"{table}_pkey"))
+    table_size, index_size = cursor.fetchone()
+    print(
+        f"{label}: {rows / elapsed:10.0f} lignes/s, "
+        f"table {table_size / 2**20:8.1f} Mo, "
+        f"index pkey {index_size / 2**20:8.1f} Mo ({index_size / rows:5.1f} o/ligne)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--batch", type=int, default=5000)
+    parser.add_argument("--keep", action="store_true", help="conserver les tables après la mesure")
+    args = parser.parse_args()
+
+    # Mêmes clés étrangères (sans contrainte) pour les deux variantes
+    users = [uuid4() for _ in range(1000)]
+    packages = [uuid4() for _ in range(20)]
+
+    register_uuid()
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        for label in GENERATORS:
+            run(cursor, label, args.rows, args.batch, users, packages)
+        if not args.keep:
+            for label in GENERATORS:
+                cursor.execute(f"DROP TABLE IF EXISTS bench_tx_{label}")
+            connection.commit()
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
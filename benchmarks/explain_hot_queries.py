@@ -0,0 +1,78 @@
+"""Vérifie par EXPLAIN que les requêtes chaudes utilisent les index attendus.
+
+Usage (depuis la racine du dépôt, base migrée, .env présent) :
+    python benchmarks/explain_hot_queries.py
+
+enable_seqscan est désactivé le temps du contrôle : sur une petite base le
+planificateur préfère un seq scan, on vérifie ici que l'index est *utilisable*.
+Code de sortie 1 si une requête n'utilise pas son index.
+"""
+import json
+import os
+import sys
+from datetime import datetime, timezone
+from uuid import uuid4
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+sys.path[:0] = [ROOT, os.path.join(ROOT, "apps"), os.path.join(ROOT, "apps", "config")]
+
+from sqlalchemy import text  # noqa: E402
+from sqlmodel import select  # noqa: E402
+from database import engine  # noqa: E402
+from apps.models.models import Package, Transaction, User, Voucher, live  # noqa: E402
+from apps.models.enums import PaymentStatus  # noqa: E402
+
+SOME_ID = uuid4()
+NOW = datetime.now(timezone.utc)
+
+HOT_QUERIES = [
+    ("transaction par référence passerelle", "transaction_payment_gateway_ref_key",
+     select(Transaction).where(Transaction.payment_gateway_ref == "TX-0", live(Transaction))),
+    ("transactions d'un utilisateur par date", "ix_transaction_user_id_created_at",
+     select(Transaction).where(Transaction.user_id == SOME_ID).order_by(Transaction.created_at).limit(50)),
+    ("transactions PENDING anciennes", "ix_transaction_payment_status_created_at",
+     select(Transaction).where(Transaction.payment_status == PaymentStatus.PENDING, Transaction.created_at < NOW)
+     .order_by(Transaction.created_at).limit(100)),
+    ("transactions d'un package", "ix_transaction_package_id_created_at",
+     select(Transaction).where(Transaction.package_id == SOME_ID)),
+    ("liste des transactions (tri par date)", "ix_transaction_created_at_id",
+     select(Transaction).order_by(Transaction.created_at.desc(), Transaction.id.desc()).limit(50)),
+    ("transactions par moyen de paiement", "ix_transaction_payment_method_created_at",
+     select(Transaction).where(Transaction.payment_method == "OM").order_by(Transaction.created_at.desc()).limit(50)),
+    ("transactions d'un package par date", "ix_transaction_package_id_created_at",
+     select(Transaction).where(Transaction.package_id == SOME_ID).order_by(Transaction.created_at.desc()).limit(50)),
+    ("vouchers d'un utilisateur", "ix_voucher_user_id",
+     select(Voucher).where(Voucher.user_id == SOME_ID)),
+    ("liste des vouchers actifs", "ix_voucher_live_generated_at",
+     select(Voucher).where(live(Voucher)).order_by(Voucher.generated_at, Voucher.id).limit(100)),
+    ("liste des utilisateurs actifs", "ix_user_live_created_at",
+     select(User).where(live(User)).order_by(User.created_at, User.id).limit(100)),
+    ("catalogue des packages", "ix_package_live_name",
+     select(Package).where(live(Package)).order_by(Package.name).limit(100)),
+]
+
+
+def index_names(plan: dict) -> set[str]:
+    names = {plan["Index Name"]} if "Index Name" in plan else set()
+    for child in plan.get("Plans", []):
+        names |= index_names(child)
+    return names
+
+
+def main() -> int:
+    failures = 0
+    with engine.connect() as conn:
+        conn.execute(text("SET enable_seqscan = off"))
+        for label, expected, stmt in HOT_QUERIES:
+            sql = stmt.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True})
+            plan = conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar_one()
+            plan = json.loads(plan) if isinstance(plan, str) else plan
+            used = index_names(plan[0]["Plan"])
+            ok = expected in used
+            failures += not ok
+            print(f"{'OK ' if ok else 'KO '} {label:<42} attendu={expected} utilisés={sorted(used) or '-'}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,23 +3,43 @@ import os
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Depends, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from sqlmodel import Session,select
-from database import engine ,get_session, create_table_in_db
-from apps.routes import package, payement,auth,user,transaction,voucher
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from database import engine ,get_async_session, create_table_in_db
+from apps.routes import package, payement,auth,user,transaction,voucher,metrics,dashboard
 from apps.models.models import User
-from apps.services.auth_service.auth import authenticate_user, create_access_token
+from services.auth_service.auth import authenticate_user, build_access_token_data, create_access_token, hashing_pool
 from datetime import timedelta
 from apps.schema.auth import Token
 from fastapi.security import OAuth2PasswordRequestForm  
 from config import config   
 from typing import Annotated
-from apps.crud.auth import get_current_user
-from apps.crud.user import get_role_by_username
+from crud.auth import get_current_user
+from services.observability_service.sql_tracing import RouteContextMiddleware
+from services.observability_service.query_counter import QueryCounterMiddleware
+from services.cache_service.invalidation import invalidation_bus
+from services.payement_service.cinetpay_client import cinetpay_client
+from services.payement_service.notification_inbox import notification_inbox
+from services.payement_service.reconciliation import reconciler
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    invalidation_bus.start()
+    notification_inbox.start()
+    reconciler.start()
+    yield
+    await reconciler.stop()
+    await notification_inbox.stop()
+    await invalidation_bus.stop()
+    await cinetpay_client.aclose()
+    hashing_pool.shutdown()
+
 
 app = FastAPI(
     title="Portail Captif MikroTik API",
     version="0.1.0",
     description="Backend pour un portail captif personnalisé avec MikroTik.",
+    lifespan=lifespan,
 )
 
 origins = [
@@ -44,6 +64,16 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"], 
 )
+app.add_middleware(RouteContextMiddleware)
+if config.app_env != "production":
+    # Compteur de requêtes SQL : en-têtes en dev, détection des N+1 en test (CI)
+    app.add_middleware(
+        QueryCounterMiddleware,
+        expose_headers=config.app_env == "development",
+        detect_n_plus_one=config.app_env == "test",
+        threshold=config.n_plus_one_threshold,
+        action=config.n_plus_one_action,
+    )
 @app.get("/")
 async def root():
     return {"message": "Bienvenue sur l'API du Portail Captif MikroTik"}
@@ -51,20 +81,17 @@ async def root():
 @app.post("/token", response_model=Token)
 async def login_for_access_token(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
 ) -> Token:
-    user = authenticate_user(form_data.username, form_data.password, session)
+    user = await authenticate_user(form_data.username, form_data.password, session)
     if not user:
         raise HTTPException(status_code=400, detail="Incorrect username or password")
     
     access_token_expires = timedelta(minutes=config.ACCESS_TOKEN_EXPIRE_MINUTES)
 
-    # Définir les scopes en fonction du rôle réel de l'utilisateur
-    user_scopes = [get_role_by_username(session, form_data.username)]
-
-
+    # Les scopes et claims viennent du rôle réel de l'utilisateur
     access_token = create_access_token(
-        data={"sub": user.username, "scopes": user_scopes},
+        data=build_access_token_data(user),
         expires_delta=access_token_expires,
     )
     return Token(access_token=access_token, token_type="bearer")
@@ -76,4 +103,6 @@ app.include_router(payement.router,  dependencies=[Depends(get_current_user)],)
 app.include_router(user.router)
 app.include_router(auth.router,)
 app.include_router(transaction.router)
-app.include_router(voucher.router)
\ No newline at end of file
+app.include_router(voucher.router)
+app.include_router(metrics.router)
+app.include_router(dashboard.router)
\ No newline at end of file
@@ -0,0 +1,47 @@
+"""Notifications CinetPay dupliquées : un seul voucher, un seul utilisateur hotspot, un seul email.
+
+Rejoue benchmarks/bench_duplicate_notifications.py contre une base migrée ;
+ignoré si DATABASE_URL n'est pas défini ou si la base ne répond pas.
+"""
+import asyncio
+import os
+import sys
+
+import pytest
+
+if not os.getenv("DATABASE_URL"):
+    pytest.skip("DATABASE_URL non défini : base PostgreSQL requise", allow_module_level=True)
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+sys.path[:0] = [os.path.join(ROOT, "benchmarks")]
+
+import bench_duplicate_notifications as bench  # noqa: E402
+from sqlalchemy import text  # noqa: E402
+from database import async_engine  # noqa: E402
+
+DUPLICATES = 20
+
+
+async def scenario(mode: str) -> dict:
+    try:
+        async with async_engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+    except Exception as exc:  # base injoignable : rien à vérifier ici
+        await async_engine.dispose()
+        pytest.skip(f"base PostgreSQL injoignable : {exc}")
+    simulated = bench.Simulated(gateway_ms=5, mikrotik_ms=50)
+    simulated.install()
+    try:
+        return await bench.run(mode, DUPLICATES, simulated)
+    finally:
+        # Chaque test a sa propre boucle : ne pas réutiliser les connexions de la précédente
+        await async_engine.dispose()
+
+
+@pytest.mark.parametrize("mode", ["webhook", "admin"])
+def test_duplicates_issue_a_single_voucher(mode):
+    result = asyncio.run(scenario(mode))
+    assert result["vouchers"] == 1
+    assert result["hotspot_users"] == 1
+    assert result["emails"] == result["expected_emails"]
+    assert result["status"] == bench.PaymentStatus.ACCEPTED
@@ -0,0 +1,41 @@
+"""?fields= sur les listes : validation des noms et forme des éléments renvoyés."""
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+sys.path[:0] = [ROOT, os.path.join(ROOT, "apps")]
+
+from fastapi import HTTPException  # noqa: E402
+from crud.pagination import parse_fields  # noqa: E402
+from schema.pagination import Page, projection  # noqa: E402
+from schema.transaction import TransactionReadSimple  # noqa: E402
+from schema.user import UserReadSimple  # noqa: E402
+from schema.voucher import VoucherReadSimple  # noqa: E402
+from services.export_service.fast_json import rows_to_dicts  # noqa: E402
+
+
+def test_unknown_field_is_rejected_with_422():
+    with pytest.raises(HTTPException) as error:
+        parse_fields("username_voucher,hashed_password", VoucherReadSimple)
+    assert error.value.status_code == 422
+    assert error.value.detail["unknown"] == ["hashed_password"]
+
+
+def test_requested_fields_are_the_only_keys():
+    fields = parse_fields("username_voucher, statut", VoucherReadSimple)
+    items = rows_to_dicts(fields, [("V-1", "active")])
+    assert items == [{"username_voucher": "V-1", "statut": "active"}]
+    Page[projection(VoucherReadSimple)].model_validate({"items": items})
+
+
+def test_missing_fields_default_to_all_fields():
+    assert parse_fields(None, UserReadSimple) == list(UserReadSimple.model_fields)
+
+
+@pytest.mark.parametrize("schema", [VoucherReadSimple, UserReadSimple, TransactionReadSimple])
+def test_projection_schema_has_no_required_field(schema):
+    json_schema = projection(schema).model_json_schema()
+    assert set(json_schema["properties"]) == set(schema.model_fields)
+    assert "required" not in json_schema